@@ -0,0 +1,107 @@
+import json
+import os
+import random
+import threading
+import time
+from agents.http_client import get_http_session, get_timeout
+
+# Endpoint padrão (Groq, protocolo OpenAI chat completions)
+GROQ_BASE_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+# Tentativas quando a API responde 429 (rate limit) e espera base do backoff exponencial
+RATE_LIMIT_RETRIES = 5
+RATE_LIMIT_BACKOFF = 2.0
+
+# Momento (time.monotonic) até o qual todas as threads esperam após um 429
+_rate_limit_until = 0.0
+_rate_limit_lock = threading.Lock()
+
+
+def _wait_rate_limit():
+    """Espera o fim de um rate limit sinalizado por qualquer thread"""
+    delay = _rate_limit_until - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+
+
+def _register_rate_limit(response, attempt):
+    """Registra um 429: respeita Retry-After ou usa backoff exponencial com jitter"""
+    global _rate_limit_until
+    try:
+        delay = float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        delay = RATE_LIMIT_BACKOFF * (2 ** attempt) + random.uniform(0, 1)
+    with _rate_limit_lock:
+        _rate_limit_until = max(_rate_limit_until, time.monotonic() + delay)
+
+
+class LLMBackend:
+    """Interface dos backends de LLM usados pelo ReleaseNotesCrewAI.
+
+    `payload` segue o corpo de uma requisição OpenAI chat completions
+    (model, messages, temperature, max_completion_tokens, ...).
+    """
+
+    def complete(self, payload):
+        """Retorna o texto completo da resposta"""
+        raise NotImplementedError
+
+    def stream(self, payload):
+        """Produz os pedaços de texto da resposta à medida que chegam"""
+        raise NotImplementedError
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """Backend HTTP para qualquer endpoint compatível com OpenAI chat completions (Groq, servidor fake local, ...)"""
+
+    def __init__(self, base_url=GROQ_BASE_URL, api_key=None):
+        self.base_url = base_url
+        self.api_key = api_key
+
+    def complete(self, payload):
+        result = self._post(payload).json()
+        return result['choices'][0]['message']['content']
+
+    def stream(self, payload):
+        payload = dict(payload, stream=True)
+        with self._post(payload, stream=True) as response:
+            # SSE é sempre UTF-8; sem charset no Content-Type o requests decodificaria como ISO-8859-1
+            for line in response.iter_lines():
+                line = line.decode("utf-8")
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+
+                choices = json.loads(data).get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+
+    def _post(self, payload, stream=False):
+        """Envia a requisição, esperando e repetindo quando a API responde 429"""
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            _wait_rate_limit()
+            response = get_http_session().post(self.base_url, headers=headers, json=payload, timeout=get_timeout(), stream=stream)
+            if response.status_code != 429 or attempt == RATE_LIMIT_RETRIES:
+                break
+            response.close()
+            _register_rate_limit(response, attempt)
+
+        if response.status_code != 200:
+            raise Exception(f"Erro na API: {response.status_code} - {response.text}")
+        return response
+
+
+def create_backend():
+    """Backend padrão: Groq, ou outro endpoint compatível definido em LLM_BASE_URL (ex.: servidor fake local)"""
+    return OpenAICompatibleBackend(
+        base_url=os.getenv("LLM_BASE_URL", GROQ_BASE_URL),
+        api_key=os.getenv("LLM_API_KEY") or os.getenv("GROQ_API_KEY")
+    )
@@ -1,47 +1,157 @@
-import requests
-import json
+import logging
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from database.collaborative_db import get_collaborative_db
+from agents.llm_cache import get_llm_cache
+from agents.backends import create_backend
+from agents.prompts import build_prompt, as_prompt_request, format_style_examples, format_few_shot_examples, FEW_SHOT_TOKEN_BUDGET
+from agents.retrieval import get_retriever
+from database.markdown_document import TASK_TYPE_ALIASES, entry_description, normalize_entry
+from instrumentation import profiled
 
-class ReleaseNotesCrewAI:
-    def __init__(self):
-        self.api_key = os.getenv("GROQ_API_KEY")
-        self.base_url = "https://api.groq.com/openai/v1/chat/completions"
-        self.db = get_collaborative_db()
-    
-    def generate_simple_description(self, task_data):
-        """Gera descrição simples usando API do Groq via requests"""
-        try:
-            prompt = f"""Você é um especialista em documentação técnica. Crie uma descrição concisa e clara para release notes.
+logger = logging.getLogger("release_notes.agents")
 
-ENTRADA:
-Task ID: {task_data['jira_task_id']}
-Tipo: {task_data['tipo_task']} 
-Descrição: {task_data['jira_task_description']}
+# Arquivo do cache de respostas do LLM, criado ao lado do banco colaborativo
+LLM_CACHE_FILENAME = "llm_cache.db"
 
-INSTRUÇÕES:
-1. Não use tags <think> ou qualquer marcação de raciocínio
-2. Para User Story: Explique o que foi implementado, como funciona e qual o benefício
-3. Para Bug: Explique qual era o problema e como foi resolvido
-4. Para Improvement: Explique a melhoria implementada e o impacto
-5. Para Technical Debt: Explique a correção técnica e os benefícios
-6. Use linguagem clara e profissional (2-5 frases)
-7. Retorne APENAS o texto descritivo, sem título ou formatação
+# Índice de busca (BM25) das release notes anteriores, salvo ao lado do banco colaborativo
+RETRIEVAL_INDEX_FILENAME = "retrieval_index.npz"
 
-EXEMPLO User Story:
-"Adicionamos um informativo mostrando o motivo do status de 'bloqueado' e status 'em observação'. Essa bottomsheet é mostrada ao clicar no status dos pontos de venda, na tela de Minuto de ouro e nas listagens de Rotas e Carteira."
+# Banco do ReleaseNotesDB, de onde vêm os documentos RAG (RAG_DB_PATH)
+DEFAULT_RAG_DB_PATH = "release_notes.db"
 
-EXEMPLO Bug:
-"Existia um bug no app em que o PDF de um pedido tinha o 'valor unitário' e 'preço por KG' calculados incorretamente. Esse valor estava errado apenas no PDF, na tela de consulta estava correto. Nessa versão igualamos as duas informações, calculando corretamente para itens com peso variável."
+# Quantidade de trechos de documentos de referência injetados no prompt da release note (RETRIEVAL_TOP_K)
+DEFAULT_RETRIEVAL_TOP_K = 3
 
-Gere apenas a descrição:"""
-            
-            result = self._call_groq_api(prompt)
+# Máximo de tasks parecidas usadas como exemplos few-shot (ainda limitadas pelo orçamento de tokens)
+FEW_SHOT_CANDIDATES = 3
+
+# Geração em lote: quantidade padrão de chamadas simultâneas à API (GROQ_MAX_CONCURRENCY)
+DEFAULT_MAX_CONCURRENCY = 4
+
+class ThinkTagFilter:
+    """Remove blocos <think>...</think> de um texto recebido em pedaços (streaming)"""
+    
+    OPEN_TAG = "<think>"
+    CLOSE_TAG = "</think>"
+    
+    def __init__(self):
+        self.buffer = ""
+        self.inside = False
+    
+    def feed(self, chunk):
+        """Recebe um pedaço do texto e devolve a parte que já pode ser exibida"""
+        self.buffer += chunk
+        output = []
+        
+        while True:
+            if self.inside:
+                end = self.buffer.find(self.CLOSE_TAG)
+                if end == -1:
+                    # Guardar só o que pode ser o começo de </think>
+                    self.buffer = self.buffer[-(len(self.CLOSE_TAG) - 1):]
+                    break
+                self.buffer = self.buffer[end + len(self.CLOSE_TAG):]
+                self.inside = False
+            else:
+                start = self.buffer.find(self.OPEN_TAG)
+                if start == -1:
+                    keep = self._partial_tag_length(self.buffer, self.OPEN_TAG)
+                    output.append(self.buffer[:len(self.buffer) - keep])
+                    self.buffer = self.buffer[len(self.buffer) - keep:]
+                    break
+                output.append(self.buffer[:start])
+                self.buffer = self.buffer[start + len(self.OPEN_TAG):]
+                self.inside = True
+        
+        return "".join(output)
+    
+    def flush(self):
+        """Devolve o que sobrou no buffer ao final do stream"""
+        text = "" if self.inside else self.buffer
+        self.buffer = ""
+        return text
+    
+    @staticmethod
+    def _partial_tag_length(text, tag):
+        """Tamanho do maior sufixo de `text` que é prefixo de `tag`"""
+        for length in range(min(len(tag) - 1, len(text)), 0, -1):
+            if text.endswith(tag[:length]):
+                return length
+        return 0
+
+class ReleaseNotesCrewAI:
+    def __init__(self, db=None, backend=None):
+        # Backend do LLM: Groq por padrão, ou o endpoint definido em LLM_BASE_URL
+        self.backend = backend or create_backend()
+        self.db = db or get_collaborative_db()
+        cache_dir = os.path.dirname(os.path.abspath(self.db.db_path))
+        # Cache de respostas do LLM (desative com LLM_CACHE_DISABLED=1)
+        if os.getenv("LLM_CACHE_DISABLED"):
+            self.cache = None
+        else:
+            self.cache = get_llm_cache(os.path.join(cache_dir, LLM_CACHE_FILENAME))
+        # Exemplos de estilo tirados das release notes anteriores (desative com RETRIEVAL_DISABLED=1)
+        if os.getenv("RETRIEVAL_DISABLED"):
+            self.retriever = None
+        else:
+            self.retriever = get_retriever(
+                os.path.join(cache_dir, RETRIEVAL_INDEX_FILENAME),
+                self.db.db_path,
+                os.getenv("RAG_DB_PATH", DEFAULT_RAG_DB_PATH)
+            )
+    
+    def generate_simple_description(self, task_data, use_cache=True):
+        """Gera descrição simples usando API do Groq via requests.
+
+        Com use_cache=False (botão "Regenerar") a resposta em cache é ignorada e substituída.
+        """
+        try:
+            request = build_prompt('simple_description', task_data, examples=self._few_shot_examples('simple_description', task_data))
+            result = self._call_groq_api(request, use_cache=use_cache)
             return self._clean_response(result)
                 
         except Exception as e:
             raise Exception(f"Erro ao gerar descrição: {str(e)}")
     
+    def stream_simple_description(self, task_data, use_cache=True):
+        """Gera a descrição simples em streaming, produzindo pedaços de texto à medida que chegam.
+
+        O texto final deve passar por _clean_response (normaliza linhas em branco).
+        """
+        try:
+            request = build_prompt('simple_description', task_data, examples=self._few_shot_examples('simple_description', task_data))
+            yield from self._stream_groq_api(request, use_cache=use_cache)
+        except Exception as e:
+            raise Exception(f"Erro ao gerar descrição: {str(e)}")
+    
+    def generate_descriptions_batch(self, tasks, max_workers=None):
+        """Gera descrições de várias tasks em paralelo, com limite de concorrência.
+
+        É um gerador: cada resultado é entregue assim que fica pronto, como
+        (índice, task_data, descrição, erro) — erro é None em caso de sucesso.
+        """
+        max_workers = max_workers or int(os.getenv("GROQ_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY))
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = {}
+        try:
+            futures = {
+                executor.submit(self.generate_simple_description, task_data): (index, task_data)
+                for index, task_data in enumerate(tasks)
+            }
+            for future in as_completed(futures):
+                index, task_data = futures[future]
+                try:
+                    yield index, task_data, future.result(), None
+                except Exception as e:
+                    yield index, task_data, None, e
+        finally:
+            # Se o consumidor parar no meio, não inicia as chamadas que ainda estão na fila
+            # (cancelamento manual: shutdown(cancel_futures=True) só existe a partir do Python 3.9)
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+    
     def _clean_response(self, text):
         """Remove tags de raciocínio e limpa a resposta"""
         import re
@@ -60,44 +170,15 @@ Gere apenas a descrição:"""
             if image_path and task_data.get('evidence_image'):
                 image_info = f"\n![{task_data['evidence_image']}](/.attachments/{task_data['evidence_image']} =300x)"
             
-            prompt = f"""Você é um redator técnico especialista. Crie uma release note seguindo EXATAMENTE o formato especificado.
-
-ENTRADA:
-- Task ID: {task_data['jira_task_id']}
-- Tipo: {task_data['tipo_task']} 
-- Título: {task_data['jira_task_title']}
-- Descrição: {task_data['jira_task_description']}
-
-FORMATO OBRIGATÓRIO:
-###[{task_data['jira_task_id']}] {task_data['jira_task_title']}
-
-[Descrição clara em 2-4 frases explicando a funcionalidade/correção]{image_info}
-
----
-
-REGRAS:
-1. NÃO inclua raciocínio, pensamentos ou tags <think>
-2. Para História: Explique o que foi implementado e o benefício para o usuário
-3. Para Bug: Explique qual era o problema e como foi resolvido
-4. Use linguagem clara e profissional
-5. Mantenha entre 2-4 frases
-6. SEMPRE termine com "---"
-7. NÃO adicione cabeçalhos como ##História ou ##Bug
-8. Retorne APENAS o bloco da release note
-
-EXEMPLO DE SAÍDA ESPERADA:
-###[JBSV-3263] Crédito/Cliente Bloqueado – Consultar o status e já retornar o direcional
-
-Adicionamos um informativo mostrando o motivo do status de "bloqueado" e status "em observação". Essa bottomsheet é mostrada ao clicar no status dos pontos de venda, na tela de Minuto de ouro e nas listagens de Rotas e Carteira.
-
-![motivo-de-bloqueio.png](/.attachments/motivo-de-bloqueio.png =300x)
-
----
-
-Gere agora a release note seguindo exatamente este formato:"""
+            request = build_prompt(
+                'release_note', task_data,
+                image_info=image_info,
+                examples=self._few_shot_examples('release_note', task_data),
+                style_examples=self._style_examples(task_data)
+            )
 
             # Gerar o conteúdo
-            generated_content = self._call_groq_api(prompt)
+            generated_content = self._call_groq_api(request)
             
             # Adicionar ao banco colaborativo com versão específica
             self.db.add_task(task_data, generated_content, version_name)
@@ -108,6 +189,56 @@ Gere agora a release note seguindo exatamente este formato:"""
         except Exception as e:
             raise Exception(f"Erro ao gerar release notes: {str(e)}")
     
+    def _few_shot_examples(self, prompt_name, task_data):
+        """Exemplos few-shot: tasks já aprovadas do mesmo tipo mais parecidas com esta, dentro do orçamento de tokens.
+
+        Retorna None (o prompt usa os exemplos fixos) se não houver tasks parecidas
+        ou se a busca falhar: os exemplos só melhoram o prompt, nunca impedem a geração.
+        """
+        if self.retriever is None:
+            return None
+        task_type = task_data.get('tipo_task')
+        try:
+            hits = self.retriever.search(
+                self._retrieval_query(task_data),
+                k=FEW_SHOT_CANDIDATES,
+                exclude_label=task_data.get('jira_task_id'),
+                task_types=(task_type,) + TASK_TYPE_ALIASES.get(task_type, ()),
+                sources=('tasks',)
+            )
+        except Exception:
+            logger.warning("Busca de exemplos few-shot falhou; usando os exemplos fixos", exc_info=True)
+            return None
+        # A mesma task pode ter sido adicionada em mais de uma versão: um exemplo por ID
+        unique_hits = {}
+        for hit in hits:
+            unique_hits.setdefault(hit.label, hit)
+        # A descrição simples é só o texto; a release note é o bloco completo
+        extract = entry_description if prompt_name == 'simple_description' else normalize_entry
+        return format_few_shot_examples(
+            prompt_name, task_type,
+            [extract(hit.text) for hit in unique_hits.values()],
+            int(os.getenv("FEW_SHOT_TOKEN_BUDGET", FEW_SHOT_TOKEN_BUDGET))
+        )
+    
+    def _style_examples(self, task_data):
+        """Trechos dos documentos de referência (rag_documents) mais parecidos com a task, formatados para o prompt (vazio se a busca falhar)"""
+        if self.retriever is None:
+            return ""
+        try:
+            hits = self.retriever.search(
+                self._retrieval_query(task_data),
+                k=int(os.getenv("RETRIEVAL_TOP_K", DEFAULT_RETRIEVAL_TOP_K)),
+                sources=('rag_documents',)
+            )
+        except Exception:
+            logger.warning("Busca de documentos de referência falhou; prompt sem referências", exc_info=True)
+            return ""
+        return format_style_examples([hit.text for hit in hits])
+    
+    def _retrieval_query(self, task_data):
+        return f"{task_data.get('jira_task_title', '')}\n{task_data.get('jira_task_description', '')}"
+    
     def get_collaborative_release_notes(self, version_name=None):
         """Retorna as release notes colaborativas de uma versão específica"""
         return self.db.generate_collaborative_markdown(version_name)
@@ -120,33 +251,76 @@ Gere agora a release note seguindo exatamente este formato:"""
         """Retorna estatísticas de uma versão específica pelo nome"""
         return self.db.get_version_stats(version_name)
     
-    def _call_groq_api(self, prompt):
-        """Chama a API do Groq usando requests diretamente"""
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        # Configuração específica para openai/gpt-oss-20b
-        data = {
+    def _build_payload(self, request):
+        """Monta o corpo da requisição de chat completion para um PromptRequest"""
+        # Configuração específica para openai/gpt-oss-20b; limites vêm do orçamento do prompt
+        return {
             "model": "openai/gpt-oss-20b",
             "messages": [
-                {"role": "user", "content": prompt}
+                {"role": "user", "content": request.prompt}
             ],
             "temperature": float(os.getenv("TEMPERATURE", 0.6)),
-            "max_completion_tokens": 8192,
+            "max_completion_tokens": request.max_completion_tokens,
             "top_p": 1,
-            "reasoning_effort": "medium"
+            "reasoning_effort": request.reasoning_effort
         }
+    
+    def _cache_key(self, request, payload):
+        """Chave do cache de respostas para a requisição (None se o cache está desativado)"""
+        if self.cache is None:
+            return None
+        # Backends sem URL (ex.: injetados em testes) são identificados pela classe
+        endpoint = getattr(self.backend, "base_url", None) or type(self.backend).__name__
+        return self.cache.make_key(endpoint, payload["model"], request.prompt, payload["temperature"], payload["reasoning_effort"])
+    
+    @profiled(rows=None)
+    def _call_groq_api(self, request, use_cache=True):
+        """Chama o LLM (Groq por padrão) e devolve a resposta limpa (com cache de respostas).
+
+        `request` é um PromptRequest (ou o texto do prompt, com o orçamento padrão).
+        """
+        request = as_prompt_request(request)
+        payload = self._build_payload(request)
         
-        response = requests.post(self.base_url, headers=headers, json=data)
+        cache_key = self._cache_key(request, payload)
+        if cache_key and use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
         
-        if response.status_code == 200:
-            result = response.json()
-            content = result['choices'][0]['message']['content']
-            return self._clean_response(content).strip()
-        else:
-            raise Exception(f"Erro na API: {response.status_code} - {response.text}")
+        content = self._clean_response(self.backend.complete(payload)).strip()
+        if cache_key:
+            self.cache.set(cache_key, content, payload["model"])
+        return content
+    
+    @profiled(rows=None)
+    def _stream_groq_api(self, request, use_cache=True):
+        """Chama o LLM em modo streaming e produz o texto aos poucos, já sem blocos <think>"""
+        request = as_prompt_request(request)
+        payload = self._build_payload(request)
+        
+        cache_key = self._cache_key(request, payload)
+        if cache_key and use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        think_filter = ThinkTagFilter()
+        raw_parts = []
+        
+        for delta in self.backend.stream(payload):
+            raw_parts.append(delta)
+            text = think_filter.feed(delta)
+            if text:
+                yield text
+        
+        text = think_filter.flush()
+        if text:
+            yield text
+        
+        if cache_key:
+            self.cache.set(cache_key, self._clean_response("".join(raw_parts)), payload["model"])
 
 # Função auxiliar para usar no Streamlit
 def create_release_notes_crew():
@@ -0,0 +1,231 @@
+"""Servidor local que imita a API OpenAI chat completions (usado no lugar do Groq).
+
+Responde de forma determinística (o texto depende só do prompt), com suporte a
+streaming (SSE), latência configurável e injeção de erros 5xx e 429. Serve
+para desenvolver e fazer testes de carga sem rede e sem consumir a API.
+
+Uso:
+    python -m agents.fake_llm_server --port 8900 --latency 0.05 --error-rate 0.01
+    LLM_BASE_URL=http://127.0.0.1:8900/v1/chat/completions streamlit run app.py
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Rota atendida (mesmo sufixo do endpoint OpenAI/Groq)
+COMPLETIONS_ROUTE = "/chat/completions"
+
+# Palavras usadas para montar as respostas sintéticas
+WORDS = (
+    "ajuste", "cadastro", "relatório", "tela", "validação", "integração", "filtro",
+    "usuário", "permissão", "exportação", "campo", "pedido", "cliente", "sistema",
+    "consulta", "processamento", "notificação", "fluxo", "regra", "histórico",
+)
+
+TASK_ID_PATTERN = re.compile(r"Task ID:\s*(\S+)")
+
+
+class FakeLLMConfig:
+    """Comportamento do servidor fake: latência e taxas de erro injetadas"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                 think=False, chunk_words=3, seed=None, fail_first=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.think = think
+        self.chunk_words = chunk_words
+        # As primeiras fail_first requisições respondem 503 (para verificar o retry do cliente)
+        self.fail_first = fail_first
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'streams': 0, 'errors': 0, 'rate_limited': 0, 'connections': 0}
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def roll(self):
+        """Sorteia o resultado da requisição: 'error', 'rate_limit' ou 'ok'"""
+        with self.lock:
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                return 'error'
+            value = self.random.random()
+        if value < self.error_rate:
+            return 'error'
+        if value < self.error_rate + self.rate_limit_rate:
+            return 'rate_limit'
+        return 'ok'
+
+    def delay(self):
+        with self.lock:
+            extra = self.random.uniform(0, self.jitter) if self.jitter else 0.0
+        return self.latency + extra
+
+
+def fake_completion(prompt, max_tokens=None):
+    """Texto determinístico para um prompt: cita o Task ID e usa palavras derivadas do hash do prompt"""
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    match = TASK_ID_PATTERN.search(prompt)
+    task_id = match.group(1) if match else "N/A"
+
+    word_count = 20 + digest[0] % 40
+    if max_tokens:
+        word_count = min(word_count, max(1, int(max_tokens)))
+    words = [WORDS[digest[i % len(digest)] % len(WORDS)] for i in range(word_count)]
+    return f"Task {task_id}: {' '.join(words).capitalize()}."
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """Atende POST .../chat/completions como a API OpenAI (com keep-alive)"""
+
+    protocol_version = "HTTP/1.1"
+    # Cabeçalho e corpo saem em escritas separadas: sem TCP_NODELAY o ACK atrasado soma ~40 ms por resposta
+    disable_nagle_algorithm = True
+    config = FakeLLMConfig()
+
+    def setup(self):
+        # Um handler por conexão TCP: conta as conexões para verificar o keep-alive
+        super().setup()
+        self.config.count('connections')
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not self.path.split("?", 1)[0].endswith(COMPLETIONS_ROUTE):
+            self._send_json(404, {"error": {"message": "Rota não encontrada"}})
+            return
+
+        try:
+            payload = json.loads(body)
+            prompt = "\n".join(message.get("content", "") for message in payload["messages"])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self._send_json(400, {"error": {"message": "Requisição inválida"}})
+            return
+
+        config = self.config
+        config.count('requests')
+
+        outcome = config.roll()
+        if outcome == 'error':
+            config.count('errors')
+            self._send_json(503, {"error": {"message": "Erro simulado"}})
+            return
+        if outcome == 'rate_limit':
+            config.count('rate_limited')
+            self._send_json(429, {"error": {"message": "Rate limit simulado"}}, {"Retry-After": "0"})
+            return
+
+        time.sleep(config.delay())
+
+        content = fake_completion(prompt, payload.get("max_completion_tokens") or payload.get("max_tokens"))
+        if config.think:
+            content = f"<think>Analisando a task.</think>{content}"
+        model = payload.get("model", "fake")
+
+        if payload.get("stream"):
+            config.count('streams')
+            self._send_stream(model, content)
+        else:
+            self._send_json(200, {
+                "id": "fake-completion",
+                "object": "chat.completion",
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            })
+
+    def _send_json(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, model, content):
+        """Envia a resposta em eventos SSE (chunked), alguns tokens por evento"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        tokens = re.findall(r"\S+\s*|\s+", content)
+        step = max(1, self.config.chunk_words)
+        for start in range(0, len(tokens), step):
+            chunk = {"object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": {"content": "".join(tokens[start:start + step])}}]}
+            self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+        self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Cliente que desistiu da resposta (timeout, streaming interrompido) não é erro do servidor
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+def start_fake_server(port=0, host="127.0.0.1", **config):
+    """Sobe o servidor fake em uma thread daemon e retorna o servidor.
+
+    Com port=0 o sistema escolhe uma porta livre (veja `fake_server_url`).
+    """
+    handler = type("Handler", (FakeLLMHandler,), {"config": FakeLLMConfig(**config)})
+    server = FakeLLMServer((host, int(port)), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fake_server_url(server):
+    """URL do endpoint de chat completions do servidor fake"""
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/v1{COMPLETIONS_ROUTE}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor fake compatível com OpenAI chat completions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.0, help="Latência fixa por resposta (segundos)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Latência extra aleatória, até este valor (segundos)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de respostas 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fração de respostas 429")
+    parser.add_argument("--think", action="store_true", help="Inclui um bloco <think> em cada resposta")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    server = start_fake_server(
+        args.port, args.host, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, think=args.think, seed=args.seed
+    )
+    print(f"Servidor fake em {fake_server_url(server)} (Ctrl+C para parar)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Timeouts padrão (segundos): conexão e leitura da resposta
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 120.0
+
+# Conexões mantidas abertas por host (keep-alive)
+DEFAULT_POOL_SIZE = 10
+
+# Falhas transitórias repetidas automaticamente (429 é tratado à parte, com backoff compartilhado)
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+DEFAULT_RETRIES = 3
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_http_session(pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES):
+    """Cria uma sessão HTTP com pool de conexões e retry para falhas transitórias"""
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=1,
+        status=retries,
+        backoff_factor=0.5,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET", "POST"]),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_http_session():
+    """Sessão HTTP compartilhada pelo processo (reaproveita conexões TCP/TLS entre chamadas)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_size = max(
+                    int(os.getenv("GROQ_HTTP_POOL_SIZE", DEFAULT_POOL_SIZE)),
+                    int(os.getenv("GROQ_MAX_CONCURRENCY", 0))
+                )
+                _session = create_http_session(
+                    pool_size=pool_size,
+                    retries=int(os.getenv("GROQ_HTTP_RETRIES", DEFAULT_RETRIES))
+                )
+    return _session
+
+
+def get_timeout():
+    """Timeouts (conexão, leitura) configuráveis por GROQ_CONNECT_TIMEOUT e GROQ_READ_TIMEOUT"""
+    return (
+        float(os.getenv("GROQ_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT)),
+        float(os.getenv("GROQ_READ_TIMEOUT", DEFAULT_READ_TIMEOUT))
+    )
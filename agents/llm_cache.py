@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from database.connection import connect
+from database.migrations import apply_migrations
+
+# Validade padrão de uma resposta em cache (segundos) e tamanho máximo do cache
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 2000
+
+def _is_mojibake(text):
+    """Texto UTF-8 que foi decodificado como ISO-8859-1 (ex.: "usuÃ¡rio" em vez de "usuário")"""
+    try:
+        return text.encode("latin-1").decode("utf-8") != text
+    except UnicodeError:
+        return False
+
+
+def _drop_mojibake_responses(conn):
+    """Apaga respostas gravadas pelo streaming antigo, que decodificava o SSE como ISO-8859-1"""
+    keys = [key for key, response in conn.execute("SELECT cache_key, response FROM llm_responses") if _is_mojibake(response)]
+    conn.executemany("DELETE FROM llm_responses WHERE cache_key = ?", ((key,) for key in keys))
+
+
+MIGRATIONS = [
+    # v1: respostas do LLM indexadas pelo hash da requisição
+    (
+        '''
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_llm_responses_last_access ON llm_responses (last_access)",
+    ),
+    # v2: descarta respostas com acentos corrompidos pelo streaming
+    _drop_mojibake_responses,
+    # v3: a chave passou a incluir o endpoint; as respostas antigas (de qualquer servidor) são descartadas
+    ("DELETE FROM llm_responses",),
+]
+
+
+class LLMResponseCache:
+    """Cache persistente (SQLite) de respostas do LLM, endereçado pelo conteúdo da requisição"""
+
+    def __init__(self, db_path, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        apply_migrations(self.db_path, MIGRATIONS)
+
+    @staticmethod
+    def make_key(endpoint, model, prompt, temperature, reasoning_effort):
+        """Hash SHA-256 dos parâmetros que determinam a resposta.
+
+        O endpoint faz parte da chave: respostas de outro servidor (ex.: o fake
+        local) com o mesmo nome de modelo não são servidas no lugar do Groq.
+        """
+        payload = json.dumps(
+            {
+                'endpoint': endpoint, 'model': model, 'prompt': prompt,
+                'temperature': temperature, 'reasoning_effort': reasoning_effort
+            },
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, cache_key):
+        """Retorna a resposta em cache ou None (respostas expiradas são descartadas)"""
+        now = time.time()
+        conn = connect(self.db_path)
+        try:
+            row = conn.execute(
+                "SELECT response, created_at FROM llm_responses WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+
+            if row and now - row[1] <= self.ttl:
+                conn.execute("UPDATE llm_responses SET last_access = ? WHERE cache_key = ?", (now, cache_key))
+                conn.commit()
+                self._count('hits')
+                return row[0]
+
+            if row:
+                conn.execute("DELETE FROM llm_responses WHERE cache_key = ?", (cache_key,))
+                conn.commit()
+            self._count('misses')
+            return None
+        finally:
+            conn.close()
+
+    def set(self, cache_key, response, model=None):
+        """Grava uma resposta e remove as menos usadas se o cache passar do limite"""
+        now = time.time()
+        conn = connect(self.db_path)
+        try:
+            conn.execute('''
+                INSERT OR REPLACE INTO llm_responses (cache_key, model, response, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (cache_key, model, response, now, now))
+
+            total = conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+            if total > self.max_entries:
+                cursor = conn.execute('''
+                    DELETE FROM llm_responses WHERE cache_key IN (
+                        SELECT cache_key FROM llm_responses ORDER BY last_access ASC LIMIT ?
+                    )
+                ''', (total - self.max_entries,))
+                self._count('evictions', cursor.rowcount)
+
+            conn.commit()
+        finally:
+            conn.close()
+
+    def clear(self):
+        """Apaga todas as respostas em cache"""
+        conn = connect(self.db_path)
+        try:
+            conn.execute("DELETE FROM llm_responses")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_stats(self):
+        """Contadores de hits, misses e remoções desde o início do processo"""
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+
+# Instâncias compartilhadas pelo processo, uma por arquivo de cache
+_cache_instances = {}
+
+
+def get_llm_cache(db_path):
+    """Retorna o cache de respostas do LLM para o arquivo indicado (configurável por variáveis de ambiente)"""
+    cache = _cache_instances.get(db_path)
+    if cache is None:
+        cache = _cache_instances.setdefault(db_path, LLMResponseCache(
+            db_path,
+            ttl=float(os.getenv("LLM_CACHE_TTL", DEFAULT_TTL)),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        ))
+    return cache
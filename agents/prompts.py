@@ -0,0 +1,207 @@
+import math
+import string
+
+# Caracteres por token (estimativa local para texto em português, sem tokenizer)
+CHARS_PER_TOKEN = 3.5
+
+# Limite de tokens de entrada por prompt; descrições maiores são truncadas
+MAX_PROMPT_TOKENS = 6000
+
+# Orçamento de saída por tipo de prompt e tipo de task: (max_completion_tokens, reasoning_effort).
+# O max_completion_tokens inclui os tokens de raciocínio do modelo; as respostas têm 2-5 frases.
+COMPLETION_BUDGETS = {
+    'simple_description': {
+        'User Story': (2048, 'medium'),
+        'Bug': (1024, 'low'),
+        'Improvement': (1024, 'low'),
+        'Technical Debt': (1024, 'low'),
+    },
+    'release_note': {
+        'User Story': (2304, 'medium'),
+        'Bug': (1280, 'low'),
+        'Improvement': (1280, 'low'),
+        'Technical Debt': (1280, 'low'),
+    },
+}
+DEFAULT_BUDGET = (2048, 'medium')
+
+
+def estimate_tokens(text):
+    """Estimativa local (e barata) da quantidade de tokens de um texto"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+class PromptTemplate:
+    """Template de prompt compilado uma única vez (texto fixo separado dos campos)"""
+
+    def __init__(self, name, text):
+        self.name = name
+        self._parts = [(literal, field) for literal, field, _, _ in string.Formatter().parse(text)]
+        self.fields = tuple(dict.fromkeys(field for _, field in self._parts if field))
+        self.static_tokens = estimate_tokens("".join(literal for literal, _ in self._parts))
+
+    def render(self, **values):
+        """Preenche os campos do template"""
+        output = []
+        for literal, field in self._parts:
+            output.append(literal)
+            if field is not None:
+                output.append(str(values[field]))
+        return "".join(output)
+
+
+class PromptRequest:
+    """Prompt pronto para envio, com a estimativa de entrada e o orçamento de saída"""
+
+    __slots__ = ('prompt', 'input_tokens', 'max_completion_tokens', 'reasoning_effort')
+
+    def __init__(self, prompt, input_tokens, max_completion_tokens, reasoning_effort):
+        self.prompt = prompt
+        self.input_tokens = input_tokens
+        self.max_completion_tokens = max_completion_tokens
+        self.reasoning_effort = reasoning_effort
+
+
+# Orçamento (tokens estimados) dos exemplos few-shot e dos trechos de documentos de referência no prompt
+FEW_SHOT_TOKEN_BUDGET = 600
+REFERENCE_TOKEN_BUDGET = 400
+
+# Exemplos fixos, usados quando ainda não há tasks parecidas do mesmo tipo no banco
+FALLBACK_EXAMPLES = {
+    'simple_description': '''EXEMPLO User Story:
+"Adicionamos um informativo mostrando o motivo do status de 'bloqueado' e status 'em observação'. Essa bottomsheet é mostrada ao clicar no status dos pontos de venda, na tela de Minuto de ouro e nas listagens de Rotas e Carteira."
+
+EXEMPLO Bug:
+"Existia um bug no app em que o PDF de um pedido tinha o 'valor unitário' e 'preço por KG' calculados incorretamente. Esse valor estava errado apenas no PDF, na tela de consulta estava correto. Nessa versão igualamos as duas informações, calculando corretamente para itens com peso variável."''',
+    'release_note': '''EXEMPLO DE SAÍDA ESPERADA:
+###[JBSV-3263] Crédito/Cliente Bloqueado – Consultar o status e já retornar o direcional
+
+Adicionamos um informativo mostrando o motivo do status de "bloqueado" e status "em observação". Essa bottomsheet é mostrada ao clicar no status dos pontos de venda, na tela de Minuto de ouro e nas listagens de Rotas e Carteira.
+
+![motivo-de-bloqueio.png](/.attachments/motivo-de-bloqueio.png =300x)
+
+---''',
+}
+
+# Cabeçalho de cada exemplo few-shot, por prompt
+FEW_SHOT_HEADINGS = {
+    'simple_description': 'EXEMPLO {task_type}:\n"{text}"',
+    'release_note': 'EXEMPLO DE SAÍDA ESPERADA:\n{text}',
+}
+
+
+def fit_token_budget(texts, budget):
+    """Textos (já em ordem de relevância) que cabem juntos no orçamento; os que estouram são pulados"""
+    selected = []
+    used = 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if used + tokens <= budget:
+            selected.append(text)
+            used += tokens
+    return selected
+
+
+def format_few_shot_examples(name, task_type, examples, budget=FEW_SHOT_TOKEN_BUDGET):
+    """Bloco de exemplos do prompt `name` dentro do orçamento de tokens (None se nenhum couber)"""
+    heading = FEW_SHOT_HEADINGS[name]
+    blocks = fit_token_budget([heading.format(task_type=task_type, text=example.strip()) for example in examples], budget)
+    return "\n\n".join(blocks) if blocks else None
+
+
+SIMPLE_DESCRIPTION_PROMPT = PromptTemplate('simple_description', """Você é um especialista em documentação técnica. Crie uma descrição concisa e clara para release notes.
+
+ENTRADA:
+Task ID: {jira_task_id}
+Tipo: {tipo_task} 
+Descrição: {jira_task_description}
+
+INSTRUÇÕES:
+1. Não use tags <think> ou qualquer marcação de raciocínio
+2. Para User Story: Explique o que foi implementado, como funciona e qual o benefício
+3. Para Bug: Explique qual era o problema e como foi resolvido
+4. Para Improvement: Explique a melhoria implementada e o impacto
+5. Para Technical Debt: Explique a correção técnica e os benefícios
+6. Use linguagem clara e profissional (2-5 frases)
+7. Retorne APENAS o texto descritivo, sem título ou formatação
+
+{examples}
+
+Gere apenas a descrição:""")
+
+RELEASE_NOTE_PROMPT = PromptTemplate('release_note', """Você é um redator técnico especialista. Crie uma release note seguindo EXATAMENTE o formato especificado.
+
+ENTRADA:
+- Task ID: {jira_task_id}
+- Tipo: {tipo_task} 
+- Título: {jira_task_title}
+- Descrição: {jira_task_description}
+
+FORMATO OBRIGATÓRIO:
+###[{jira_task_id}] {jira_task_title}
+
+[Descrição clara em 2-4 frases explicando a funcionalidade/correção]{image_info}
+
+---
+
+REGRAS:
+1. NÃO inclua raciocínio, pensamentos ou tags <think>
+2. Para História: Explique o que foi implementado e o benefício para o usuário
+3. Para Bug: Explique qual era o problema e como foi resolvido
+4. Use linguagem clara e profissional
+5. Mantenha entre 2-4 frases
+6. SEMPRE termine com "---"
+7. NÃO adicione cabeçalhos como ##História ou ##Bug
+8. Retorne APENAS o bloco da release note
+
+{examples}
+{style_examples}
+Gere agora a release note seguindo exatamente este formato:""")
+
+def format_style_examples(examples, budget=REFERENCE_TOKEN_BUDGET):
+    """Bloco do prompt com trechos de documentos de referência (vazio se não houver trechos)"""
+    blocks = fit_token_budget([example.strip() for example in examples], budget)
+    if not blocks:
+        return ""
+    return "\nDOCUMENTOS DE REFERÊNCIA DO PROJETO (siga o mesmo estilo, sem copiar o conteúdo):\n" + "\n\n".join(blocks) + "\n"
+
+
+# Registro de prompts por nome
+PROMPTS = {
+    SIMPLE_DESCRIPTION_PROMPT.name: SIMPLE_DESCRIPTION_PROMPT,
+    RELEASE_NOTE_PROMPT.name: RELEASE_NOTE_PROMPT,
+}
+
+
+def build_prompt(name, task_data, **extra):
+    """Renderiza o prompt `name` para a task e escolhe o orçamento de tokens pelo tipo da task"""
+    template = PROMPTS[name]
+    values = {field: task_data.get(field, '') for field in template.fields}
+    values.update(extra)
+    # Sem exemplos few-shot selecionados: usa os exemplos fixos
+    if 'examples' in template.fields and not values.get('examples'):
+        values['examples'] = FALLBACK_EXAMPLES[name]
+
+    # Truncar a descrição se o prompt passar do limite de entrada
+    dynamic_tokens = sum(
+        estimate_tokens(str(values[field]))
+        for literal, field in template._parts if field
+    )
+    overflow = template.static_tokens + dynamic_tokens - MAX_PROMPT_TOKENS
+    description = str(values.get('jira_task_description', ''))
+    if overflow > 0 and description:
+        keep_chars = max(0, len(description) - math.ceil(overflow * CHARS_PER_TOKEN))
+        values['jira_task_description'] = description[:keep_chars].rstrip() + " [...]"
+
+    prompt = template.render(**values)
+    max_completion_tokens, reasoning_effort = COMPLETION_BUDGETS.get(name, {}).get(
+        task_data.get('tipo_task'), DEFAULT_BUDGET
+    )
+    return PromptRequest(prompt, estimate_tokens(prompt), max_completion_tokens, reasoning_effort)
+
+
+def as_prompt_request(prompt):
+    """Aceita um PromptRequest ou o texto puro do prompt (usa o orçamento padrão)"""
+    if isinstance(prompt, PromptRequest):
+        return prompt
+    return PromptRequest(prompt, estimate_tokens(prompt), *DEFAULT_BUDGET)
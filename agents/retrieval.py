@@ -0,0 +1,473 @@
+import io
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+import numpy as np
+
+from database.connection import connect
+from database.markdown_document import MANUAL_EDIT_TYPE
+from instrumentation import profiled
+
+logger = logging.getLogger("release_notes.retrieval")
+
+# Parâmetros do BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Tamanho máximo (em palavras) de um trecho indexado; parágrafos são mantidos inteiros quando cabem
+CHUNK_WORDS = 200
+
+# Quantidade padrão de exemplos retornados por busca
+DEFAULT_TOP_K = 3
+
+# Candidatos além de k, para repor os trechos descartados por exclude_label
+EXTRA_CANDIDATES = 8
+
+# Trechos removidos acima desta fração do índice disparam a compactação
+COMPACT_RATIO = 0.25
+
+# Intervalo mínimo (segundos) entre gravações do índice em disco; o arquivo só acelera a
+# próxima inicialização, as linhas novas depois da última gravação são reindexadas
+SAVE_INTERVAL = 30
+
+# Versão do formato do arquivo do índice; arquivos de outra versão são reconstruídos
+INDEX_FORMAT = 1
+
+# Palavras muito frequentes em português que não ajudam a ranquear
+STOPWORDS = frozenset("""
+    a ao aos as com como da das de do dos e em era essa esse esta este foi for ha isso mais mas na nas
+    nao no nos o os ou para pela pelo por que se sem ser seu sua tambem um uma foram sao estava
+""".split())
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Termos de um texto: minúsculas, sem acentos, sem stopwords e sem termos de uma letra"""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    return [term for term in TOKEN_PATTERN.findall(text) if len(term) > 1 and term not in STOPWORDS]
+
+
+def chunk_text(text, max_words=CHUNK_WORDS):
+    """Divide o texto em trechos de até max_words palavras, agrupando parágrafos inteiros"""
+    chunks = []
+    current = []
+    current_words = 0
+
+    for paragraph in re.split(r"\n\s*\n", text.strip()):
+        paragraph = paragraph.strip()
+        words = paragraph.split()
+        if not words:
+            continue
+        if current and current_words + len(words) > max_words:
+            chunks.append("\n\n".join(current))
+            current, current_words = [], 0
+        if len(words) > max_words:
+            # Parágrafo maior que um trecho: quebra por palavras
+            chunks.extend(" ".join(words[start:start + max_words]) for start in range(0, len(words), max_words))
+            continue
+        current.append(paragraph)
+        current_words += len(words)
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+class TableSource:
+    """Fonte de textos do índice: uma tabela com id AUTOINCREMENT.
+
+    Linhas novas recebem ids maiores que os já indexados, então o maior id
+    indexado basta para buscar só as novas; (quantidade, maior id) muda a
+    cada inserção ou remoção e serve de impressão digital da tabela. Se o
+    maior id cair abaixo do já indexado (sequência reiniciada, banco
+    recriado), o Retriever reindexa a fonte do zero.
+    """
+
+    def __init__(self, name, db_path, table, label_column, type_column, text_column, where="1"):
+        self.name = name
+        self.db_path = db_path
+        self._fingerprint_sql = f"SELECT COUNT(*), COALESCE(MAX(id), 0) FROM {table} WHERE {where}"
+        self._ids_sql = f"SELECT id FROM {table} WHERE {where}"
+        self._text_sql = f"SELECT {text_column} FROM {table} WHERE id = ?"
+        self._rows_sql = (
+            f"SELECT id, {label_column}, {type_column}, {text_column} FROM {table} "
+            f"WHERE {where} AND id > ? ORDER BY id"
+        )
+
+    def _query(self, sql, params=()):
+        # Não cria o arquivo do banco se ele ainda não existe
+        if not os.path.exists(self.db_path):
+            return None
+        conn = connect(self.db_path)
+        try:
+            return conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError:
+            # Tabela ainda não criada neste banco
+            return None
+        finally:
+            conn.close()
+
+    def fingerprint(self):
+        """(quantidade de linhas, maior id), ou None se a fonte não está disponível"""
+        rows = self._query(self._fingerprint_sql)
+        return tuple(rows[0]) if rows else None
+
+    def ids(self):
+        return {row[0] for row in self._query(self._ids_sql) or ()}
+
+    def rows_after(self, last_id):
+        """(id, rótulo, tipo da task, texto) das linhas com id maior que last_id"""
+        return self._query(self._rows_sql, (last_id,)) or []
+
+    def text(self, row_id):
+        """Texto de uma linha (None se ela não existe mais)"""
+        rows = self._query(self._text_sql, (row_id,))
+        return rows[0][0] if rows else None
+
+
+class RetrievalHit:
+    """Trecho encontrado pela busca"""
+
+    __slots__ = ('source', 'label', 'task_type', 'text', 'score')
+
+    def __init__(self, source, label, task_type, text, score):
+        self.source = source
+        self.label = label
+        self.task_type = task_type
+        self.text = text
+        self.score = score
+
+
+class Retriever:
+    """Índice BM25 (NumPy) dos textos já escritos: release notes geradas e documentos RAG.
+
+    Os trechos ficam em listas invertidas no formato CSR (para cada termo, os
+    trechos e as frequências), então uma busca só toca os trechos que contêm
+    os termos da consulta. O índice é salvo em disco e, a cada busca, apenas
+    as linhas novas das fontes são tokenizadas; linhas removidas são
+    marcadas como mortas e descartadas na próxima compactação.
+    """
+
+    def __init__(self, index_path, sources):
+        self.index_path = index_path
+        self.sources = sources
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+        self._last_save = 0.0
+        self._sources_by_name = {source.name: source for source in sources}
+        self._reset()
+
+    def _reset(self):
+        self.vocab = {}
+        # Um item por trecho: (fonte, id da linha, posição do trecho na linha, rótulo, tipo da task).
+        # O texto não fica no índice: é lido da fonte só para os trechos retornados
+        self.chunks = []
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.post_docs = np.zeros(0, dtype=np.int32)
+        self.post_tf = np.zeros(0, dtype=np.float32)
+        self.doc_len = np.zeros(0, dtype=np.float32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.fingerprints = {}
+        self.watermarks = {}
+        self._rows = {}
+        self._update_totals()
+
+    def _filter_mask(self, task_types, sources):
+        """Trechos vivos que passam pelos filtros (calculado uma vez por índice e filtro)"""
+        if task_types is None and sources is None:
+            return self.alive
+        key = (tuple(task_types) if task_types is not None else None, tuple(sources) if sources is not None else None)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = np.fromiter(
+                (
+                    (task_types is None or chunk[4] in task_types) and (sources is None or chunk[0] in sources)
+                    for chunk in self.chunks
+                ),
+                dtype=bool,
+                count=len(self.chunks)
+            ) & self.alive
+            self._masks[key] = mask
+        return mask
+
+    def _update_totals(self):
+        self._masks = {}
+        self.alive_count = int(self.alive.sum())
+        self.avg_len = float(self.doc_len[self.alive].mean()) if self.alive_count else 0.0
+
+    def _index_rows(self):
+        """Trechos vivos por (fonte, id da linha)"""
+        self._rows = {}
+        for index, chunk in enumerate(self.chunks):
+            if self.alive[index]:
+                self._rows.setdefault((chunk[0], chunk[1]), []).append(index)
+
+    def load(self):
+        """Carrega o índice salvo; um arquivo ausente, corrompido ou de outro formato é ignorado.
+
+        O índice é reconstruído a partir das fontes e o arquivo é regravado no próximo save.
+        """
+        self._reset()
+        try:
+            with np.load(self.index_path, allow_pickle=False) as data:
+                meta = json.loads(bytes(data['meta']).decode("utf-8"))
+                if meta['format'] != INDEX_FORMAT:
+                    return
+                self.offsets = data['offsets']
+                self.post_docs = data['post_docs']
+                self.post_tf = data['post_tf']
+                self.doc_len = data['doc_len']
+                self.alive = data['alive']
+            self.vocab = {term: term_id for term_id, term in enumerate(meta['vocab'])}
+            self.chunks = [tuple(chunk) for chunk in meta['chunks']]
+            self.fingerprints = {name: tuple(value) for name, value in meta['fingerprints'].items()}
+            self.watermarks = meta['watermarks']
+            self._index_rows()
+            self._update_totals()
+        except FileNotFoundError:
+            self._reset()
+        except Exception as e:
+            # Zip danificado, array ilegível, meta inválida...: qualquer falha aqui só custa uma reconstrução
+            logger.warning("Índice de exemplos ilegível (%s), reconstruindo: %s", self.index_path, e)
+            self._reset()
+
+    def save(self):
+        """Grava o índice em arquivo temporário e renomeia (leitores nunca veem um arquivo pela metade)"""
+        vocab = [None] * len(self.vocab)
+        for term, term_id in self.vocab.items():
+            vocab[term_id] = term
+        meta = {
+            'format': INDEX_FORMAT,
+            'vocab': vocab,
+            'chunks': self.chunks,
+            'fingerprints': self.fingerprints,
+            'watermarks': self.watermarks,
+        }
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            meta=np.frombuffer(json.dumps(meta, ensure_ascii=False).encode("utf-8"), dtype=np.uint8),
+            offsets=self.offsets,
+            post_docs=self.post_docs,
+            post_tf=self.post_tf,
+            doc_len=self.doc_len,
+            alive=self.alive,
+        )
+
+        directory = os.path.dirname(os.path.abspath(self.index_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(buffer.getvalue())
+            os.replace(tmp_path, self.index_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def refresh(self):
+        """Indexa as linhas novas e remove as apagadas; retorna True se o índice mudou"""
+        changed = False
+        for source in self.sources:
+            fingerprint = source.fingerprint()
+            if fingerprint == self.fingerprints.get(source.name):
+                continue
+
+            if fingerprint is None:
+                # Fonte indisponível (banco ou tabela removidos): descarta o que foi indexado dela
+                self._kill_rows(key for key in self._rows if key[0] == source.name)
+                self.fingerprints.pop(source.name, None)
+                self.watermarks.pop(source.name, None)
+                changed = True
+                continue
+
+            last_id = self.watermarks.get(source.name, 0)
+            if fingerprint[1] < last_id:
+                # Ids voltaram a ser usados: o que foi indexado desta fonte não vale mais
+                self._kill_rows([key for key in self._rows if key[0] == source.name])
+                last_id = 0
+
+            new_chunks = []
+            for row_id, label, task_type, text in source.rows_after(last_id):
+                new_chunks.extend(
+                    ((source.name, row_id, position, label, task_type), chunk)
+                    for position, chunk in enumerate(chunk_text(text or ""))
+                )
+                last_id = max(last_id, row_id)
+            self._add_chunks(new_chunks)
+            self.watermarks[source.name] = last_id
+
+            # Menos linhas na tabela do que no índice: alguma foi apagada
+            indexed = [key for key in self._rows if key[0] == source.name]
+            if len(indexed) > fingerprint[0]:
+                current = source.ids()
+                self._kill_rows(key for key in indexed if key[1] not in current)
+
+            self.fingerprints[source.name] = fingerprint
+            changed = True
+
+        if changed:
+            if len(self.chunks) - self.alive.sum() > COMPACT_RATIO * len(self.chunks):
+                self._compact()
+            self._update_totals()
+        return changed
+
+    def _kill_rows(self, keys):
+        for key in list(keys):
+            for index in self._rows.pop(key, ()):
+                self.alive[index] = False
+
+    def _add_chunks(self, new_chunks):
+        if not new_chunks:
+            return
+
+        base = len(self.chunks)
+        terms, docs, tfs, lengths = [], [], [], []
+        for offset, (chunk, text) in enumerate(new_chunks):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                terms.append(self.vocab.setdefault(term, len(self.vocab)))
+                docs.append(base + offset)
+                tfs.append(tf)
+            self._rows.setdefault((chunk[0], chunk[1]), []).append(base + offset)
+
+        self.chunks.extend(chunk for chunk, _ in new_chunks)
+        self.doc_len = np.concatenate([self.doc_len, np.array(lengths, dtype=np.float32)])
+        self.alive = np.concatenate([self.alive, np.ones(len(new_chunks), dtype=bool)])
+
+        old_terms = np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+        self._set_postings(
+            np.concatenate([old_terms, np.array(terms, dtype=np.int64)]),
+            np.concatenate([self.post_docs, np.array(docs, dtype=np.int32)]),
+            np.concatenate([self.post_tf, np.array(tfs, dtype=np.float32)]),
+        )
+
+    def _set_postings(self, terms, docs, tfs):
+        """Reorganiza as postagens (termo, trecho, frequência) em listas invertidas CSR"""
+        # Ordenação estável: dentro de cada termo os trechos continuam em ordem crescente
+        order = np.argsort(terms, kind="stable")
+        self.post_docs = docs[order]
+        self.post_tf = tfs[order]
+        self.offsets = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(self.vocab)), out=self.offsets[1:])
+
+    def _compact(self):
+        """Descarta os trechos mortos e renumera os restantes"""
+        terms = np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+        keep = self.alive[self.post_docs]
+        new_ids = np.cumsum(self.alive) - 1
+
+        self.chunks = [chunk for chunk, alive in zip(self.chunks, self.alive) if alive]
+        self.doc_len = self.doc_len[self.alive]
+        self._set_postings(terms[keep], new_ids[self.post_docs[keep]].astype(np.int32), self.post_tf[keep])
+        self.alive = np.ones(len(self.chunks), dtype=bool)
+        self._index_rows()
+
+    def _ensure_fresh(self):
+        if not self._loaded:
+            self.load()
+            self._loaded = True
+        if self.refresh():
+            self._dirty = True
+        if self._dirty and time.monotonic() - self._last_save >= SAVE_INTERVAL:
+            try:
+                self.save()
+                self._dirty = False
+            except OSError as e:
+                # Diretório sem permissão, disco cheio...: o índice continua em memória e a gravação é tentada de novo depois
+                logger.warning("Não foi possível gravar o índice de exemplos (%s): %s", self.index_path, e)
+            self._last_save = time.monotonic()
+
+    @profiled(rows=len)
+    def search(self, query, k=DEFAULT_TOP_K, exclude_label=None, task_types=None, sources=None):
+        """Os k trechos mais relevantes para a consulta (BM25), do melhor para o pior.
+
+        exclude_label descarta os trechos de uma linha (ex.: a própria task
+        que está sendo gerada); task_types e sources restringem a busca a
+        alguns tipos de task e a algumas fontes.
+        """
+        with self._lock:
+            self._ensure_fresh()
+
+            term_ids = {self.vocab[term] for term in tokenize(query) if term in self.vocab}
+            if not term_ids or not self.alive_count:
+                return []
+
+            scores = np.zeros(len(self.chunks), dtype=np.float32)
+            for term_id in term_ids:
+                start, end = self.offsets[term_id], self.offsets[term_id + 1]
+                docs = self.post_docs[start:end]
+                tf = self.post_tf[start:end]
+                df = end - start
+                idf = math.log(1 + (self.alive_count - df + 0.5) / (df + 0.5))
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[docs] / self.avg_len)
+                scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+            scores[~self._filter_mask(task_types, sources)] = 0
+
+            candidates = np.flatnonzero(scores > 0)
+            if not len(candidates):
+                return []
+            # Alguns extras para compensar os trechos excluídos pelo rótulo
+            take = min(len(candidates), k + EXTRA_CANDIDATES)
+            top = candidates[np.argpartition(-scores[candidates], take - 1)[:take]]
+            top = top[np.argsort(-scores[top], kind="stable")]
+
+            hits = []
+            for index in top:
+                source, row_id, position, label, task_type = self.chunks[index]
+                if exclude_label is not None and label == exclude_label:
+                    continue
+                text = self._chunk_text(source, row_id, position)
+                # A mesma task pode estar em mais de uma versão com o mesmo texto
+                if text is None or any(hit.text == text for hit in hits):
+                    continue
+                hits.append(RetrievalHit(source, label, task_type, text, float(scores[index])))
+                if len(hits) == k:
+                    break
+            return hits
+
+    def _chunk_text(self, source_name, row_id, position):
+        """Relê a linha na fonte e refaz a divisão para obter o texto do trecho"""
+        source = self._sources_by_name.get(source_name)
+        text = source.text(row_id) if source else None
+        if text is None:
+            return None
+        chunks = chunk_text(text)
+        return chunks[position] if position < len(chunks) else None
+
+
+def default_sources(db_path, rag_db_path=None):
+    """Release notes já geradas (tabela tasks) e, se existir, a tabela rag_documents do ReleaseNotesDB"""
+    sources = [
+        TableSource(
+            'tasks', db_path, 'tasks', 'jira_task_id', 'task_type', 'generated_content',
+            where=f"task_type != '{MANUAL_EDIT_TYPE}'"
+        ),
+    ]
+    if rag_db_path:
+        sources.append(TableSource('rag_documents', rag_db_path, 'rag_documents', 'filename', 'NULL', 'content'))
+    return sources
+
+
+# Instâncias compartilhadas pelo processo, uma por arquivo de índice
+_retriever_instances = {}
+
+
+def get_retriever(index_path, db_path, rag_db_path=None):
+    """Retorna o índice de busca salvo em index_path (carregado só na primeira busca)"""
+    retriever = _retriever_instances.get(index_path)
+    if retriever is None:
+        retriever = _retriever_instances.setdefault(index_path, Retriever(index_path, default_sources(db_path, rag_db_path)))
+    return retriever
@@ -1,7 +1,12 @@
 import streamlit as st
 import os
+import html
 from datetime import datetime
 from agents.crew_requests import ReleaseNotesCrewAI
+from database.collaborative_db import get_collaborative_db, HIGHLIGHT_START, HIGHLIGHT_END
+from database.markdown_document import format_task_entry
+from download_server import start_download_server, download_url
+from instrumentation import current_profile, start_rerun, finish_rerun
 
 # Deploy: 2025-10-01 - Interface melhorada
 
@@ -18,6 +23,15 @@ try:
 except ImportError:
     pass  # dotenv não é essencial no Streamlit Cloud
 
+# Servidor local de downloads (opcional): entrega o markdown de uma versão só quando o link é clicado
+DOWNLOAD_SERVER_PORT = os.getenv("DOWNLOAD_SERVER_PORT")
+DOWNLOAD_BASE_URL = os.getenv("DOWNLOAD_SERVER_URL") or (f"http://localhost:{DOWNLOAD_SERVER_PORT}" if DOWNLOAD_SERVER_PORT else None)
+if DOWNLOAD_SERVER_PORT:
+    start_download_server(DOWNLOAD_SERVER_PORT, host=os.getenv("DOWNLOAD_SERVER_HOST", "127.0.0.1"))
+
+# Painel de debug com os tempos de cada rerun (SHOW_DB_POOL_STATS mantido por compatibilidade)
+DEBUG_PANEL = bool(os.getenv("SHOW_DEBUG_PANEL") or os.getenv("SHOW_DB_POOL_STATS"))
+
 # Configuração da página
 st.set_page_config(
     page_title="Gerador de Release Notes",
@@ -178,9 +192,86 @@ st.markdown("""
         color: #6c757d;
         font-style: italic;
     }
+    .search-hit {
+        margin-bottom: 8px;
+        padding: 8px;
+        border-radius: 6px;
+        border: 1px solid #e1e5e9;
+        font-size: 0.8rem;
+    }
+    .search-hit-title {
+        font-weight: 600;
+    }
+    .search-hit-meta {
+        font-size: 0.7rem;
+        color: #6c757d;
+    }
+    .search-hit mark {
+        background: #fff3b0;
+        padding: 0;
+    }
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_version_markdown(version_name, content_hash):
+    """Monta o markdown de uma versão para download.
+
+    O hash do conteúdo faz parte da chave do cache: qualquer alteração nas
+    tasks da versão gera um novo hash e força a remontagem.
+    """
+    return ReleaseNotesCrewAI().get_collaborative_release_notes(version_name)
+
+def render_debug_panel():
+    """Painel de debug: tempo do rerun até aqui, chamadas por operação e uso do pool de conexões"""
+    profile = current_profile()
+    if profile is None:
+        return
+    summary = profile.summary()
+    pool_stats = summary['pool']
+
+    with st.expander(f"⏱️ Debug: {summary['wall_ms']:.0f} ms neste rerun", expanded=False):
+        st.caption(f"SQLite: {pool_stats['opened']} conexões abertas • {pool_stats['reused']} reutilizadas")
+        if summary['operations']:
+            st.dataframe(
+                [
+                    {
+                        'Operação': operation['name'],
+                        'Chamadas': operation['calls'],
+                        'Total (ms)': operation['total_ms'],
+                        'Máx (ms)': operation['max_ms'],
+                        'Linhas': operation['rows'],
+                        'Erros': operation['errors'],
+                    }
+                    for operation in summary['operations']
+                ],
+                hide_index=True,
+                use_container_width=True
+            )
+        else:
+            st.caption("Nenhuma operação medida")
+
+def highlight_html(text):
+    """Escapa o texto de um resultado de busca e marca os termos encontrados com <mark>"""
+    escaped = html.escape(text or "")
+    return escaped.replace(HIGHLIGHT_START, "<mark>").replace(HIGHLIGHT_END, "</mark>")
+
+def render_search_results(db, query):
+    """Resultados da busca nas tasks, dos mais relevantes para os menos"""
+    results = db.search_tasks(query)
+    if not results:
+        st.caption("Nenhuma task encontrada")
+        return
+
+    for result in results:
+        st.markdown(f'''
+        <div class="search-hit">
+            <div class="search-hit-title">{html.escape(result['jira_task_id'])} - {highlight_html(result['title'])}</div>
+            <div class="search-hit-meta">{html.escape(result['version_name'])} • {html.escape(result['task_type'] or "")}</div>
+            <div>{highlight_html(result['snippet'])}</div>
+        </div>
+        ''', unsafe_allow_html=True)
+
 def main():
     # Header principal com logo
     try:
@@ -379,9 +470,20 @@ def main():
         # Botões de ação
         col_btn1, col_btn2 = st.columns(2)
         
+        # Se já existe preview para exatamente estes dados, o clique é um "Regenerar" (ignora o cache da IA)
+        current_inputs = {
+            "tipo_task": tipo_task,
+            "jira_task_id": jira_task_id,
+            "jira_task_title": jira_task_title,
+            "jira_task_description": jira_task_description,
+            "qa_level": qa_level,
+            "tfs_link": tfs_link
+        }
+        regenerate = bool(st.session_state.get('generated_preview')) and st.session_state.get('current_task_data') == current_inputs
+        
         with col_btn1:
             generate_preview_button = st.button(
-                "Gerar Preview",
+                "Regenerar Preview" if regenerate else "Gerar Preview",
                 disabled=not (jira_task_id and jira_task_title and jira_task_description and version_name.strip() and qa_level is not None),
                 help="Gera um preview da descrição que você pode editar antes de adicionar",
                 use_container_width=True
@@ -409,29 +511,30 @@ def main():
         # Gerar Preview
         if generate_preview_button:
             try:
-                with st.spinner("Gerando preview da descrição..."):
-                    # Preparar dados da task
-                    task_data = {
-                        "tipo_task": tipo_task,
-                        "jira_task_id": jira_task_id,
-                        "jira_task_title": jira_task_title,
-                        "jira_task_description": jira_task_description,
-                        "qa_level": qa_level,
-                        "tfs_link": tfs_link
-                    }
-                    
-                    # Gerar apenas a descrição simples
-                    crew = ReleaseNotesCrewAI()
-                    generated_description = crew.generate_simple_description(task_data)
-                    
-                    # Armazenar no session_state
-                    st.session_state.generated_preview = generated_description
-                    st.session_state.current_task_data = task_data
-                    st.session_state.current_version = version_name.strip()
-                    
-                    st.success("Preview gerado! Você pode editar a descrição abaixo.")
-                    st.rerun()
-                    
+                # Preparar dados da task
+                task_data = dict(current_inputs)
+                
+                # Gerar apenas a descrição simples, exibindo o texto à medida que chega
+                crew = ReleaseNotesCrewAI()
+                st.markdown('<div class="preview-title">Gerando preview da descrição...</div>', unsafe_allow_html=True)
+                streaming_area = st.empty()
+                streamed_text = ""
+                for chunk in crew.stream_simple_description(task_data, use_cache=not regenerate):
+                    streamed_text += chunk
+                    streaming_area.markdown(streamed_text + "▌")
+                
+                generated_description = crew._clean_response(streamed_text)
+                if not generated_description:
+                    raise Exception("A IA não retornou nenhum texto")
+                
+                # Armazenar no session_state
+                st.session_state.generated_preview = generated_description
+                st.session_state.current_task_data = task_data
+                st.session_state.current_version = version_name.strip()
+                
+                st.success("Preview gerado! Você pode editar a descrição abaixo.")
+                st.rerun()
+                
             except Exception as e:
                 st.error(f"Erro ao gerar preview: {str(e)}")
         
@@ -454,19 +557,9 @@ def main():
                 task_data = st.session_state.current_task_data
                 task_id = task_data['jira_task_id']
                 task_title = task_data['jira_task_title']
-                qa_level = task_data['qa_level']
-                tfs_link = task_data.get('tfs_link')
-                
-                # Criar título com ou sem link
-                if tfs_link:
-                    title_formatted = f"###[[{task_id}] {task_title}]({tfs_link})"
-                else:
-                    title_formatted = f"###[{task_id}] {task_title}"
                 
-                # Linha QA Level
-                qa_line = f"\n\n**QA Level: {qa_level}**\n\n"
-                
-                preview_markdown = f"{title_formatted}{qa_line}{edited_description.strip()}\n\n---"
+                # Título (com ou sem link), QA Level e descrição
+                preview_markdown = format_task_entry(task_data, edited_description)
                 
                 # Layout lado a lado: Markdown | Preview
                 col_md, col_preview = st.columns([1, 1])
@@ -484,6 +577,22 @@ def main():
                     
                     st.markdown("---")
             
+            # Avisar sobre tasks quase iguais já gravadas (mesmo trabalho com outro ID, ou colado duas vezes)
+            try:
+                duplicates = get_collaborative_db().find_near_duplicates(
+                    st.session_state.current_task_data, st.session_state.current_version
+                )
+            except Exception as e:
+                st.error(f"Erro ao verificar tasks duplicadas: {str(e)}")
+                duplicates = []
+            if duplicates:
+                duplicate_lines = "\n".join(
+                    f"- **{duplicate['jira_task_id']}** {duplicate['task_title']} "
+                    f"(versão {duplicate['version_name']}, {duplicate['similarity']:.0%} parecida)"
+                    for duplicate in duplicates[:5]
+                )
+                st.warning(f"⚠️ Possível duplicata: já existem tasks muito parecidas com esta\n\n{duplicate_lines}")
+            
             # Armazenar descrição editada
             st.session_state.edited_description = edited_description
         
@@ -496,17 +605,8 @@ def main():
                     task_data = st.session_state.current_task_data
                     version_name = st.session_state.current_version
                     
-                    # Criar título com ou sem link TFS
-                    if task_data.get('tfs_link'):
-                        title_formatted = f"###[[{task_data['jira_task_id']}] {task_data['jira_task_title']}]({task_data['tfs_link']})"
-                    else:
-                        title_formatted = f"###[{task_data['jira_task_id']}] {task_data['jira_task_title']}"
-                    
-                    # Linha QA Level
-                    qa_line = f"\n\n**QA Level: {task_data['qa_level']}**\n\n"
-                    
-                    # Criar release note final
-                    final_release_note = f"{title_formatted}{qa_line}{edited_desc.strip()}\n\n---"
+                    # Criar release note final (título com ou sem link TFS + QA Level)
+                    final_release_note = format_task_entry(task_data, edited_desc)
                     
                     # Adicionar ao banco colaborativo
                     crew = ReleaseNotesCrewAI()
@@ -564,124 +664,87 @@ def main():
     
     # Painel lateral direito
     with col_sidebar:
+        # Busca textual nas tasks de todas as versões
+        search_query = st.text_input("🔎 Buscar tasks", key="search_query", placeholder="ID, título ou texto")
+        if search_query.strip():
+            try:
+                render_search_results(get_collaborative_db(), search_query)
+            except Exception as e:
+                st.error(f"Erro na busca: {str(e)}")
+        
         st.markdown("#### Versões")
         
-        # Buscar todas as versões do banco
+        # Buscar resumo de todas as versões do banco (uma única consulta agregada)
         try:
             crew = ReleaseNotesCrewAI()
-            # Vou criar uma função para listar versões na crew_requests.py
-            versions = crew.db.get_all_versions()
+            versions = crew.db.get_versions_summary()
             
             if versions:
                 for version_data in versions:
-                    version_name_db = version_data[1]  # version_name
-                    created_at = version_data[2]  # created_at
+                    version_name_db = version_data['version_name']
+                    has_content = version_data['task_count'] > 0
                     
-                    # Tentar gerar o link de download para cada versão
-                    try:
-                        current_markdown = crew.get_collaborative_release_notes(version_name_db)
-                        
-                        if current_markdown and "Nenhuma task adicionada ainda" not in current_markdown:
-                            # Criar link de download
-                            import base64
-                            b64 = base64.b64encode(current_markdown.encode()).decode()
-                            filename = f"release_notes_{version_name_db}_{datetime.now().strftime('%Y%m%d_%H%M')}.md"
-                            
-                            # Layout horizontal da versão com botões
-                            version_color = "#0066cc" if 'version_name' in locals() and version_name and version_name.strip() == version_name_db else "#333"
-                            
-                            # Container da versão com layout horizontal melhorado
-                            version_html = f'''
-                            <div class="version-row">
-                                <div class="version-name" style="color: {version_color};">{version_name_db}</div>
-                                <div class="version-buttons">
-                                    <a href="data:text/markdown;base64,{b64}" download="{filename}" class="version-btn download-btn" title="Baixar Release Notes">
-                                        📥 Download
-                                    </a>
-                                </div>
-                            </div>
-                            '''
-                            
-                            st.markdown(version_html, unsafe_allow_html=True)
-                            
-                            # Botões de ação em colunas
-                            col_edit, col_delete = st.columns([1, 1])
-                            
-                            with col_edit:
-                                if st.button("✏️ Editar", key=f"edit_{version_name_db}", help="Editar esta versão", use_container_width=True):
-                                    st.session_state.editing_version = version_name_db
-                                    st.session_state.editing_content = current_markdown
-                                    st.rerun()
-                            
-                            with col_delete:
-                                if st.button("🗑️ Excluir", key=f"delete_{version_name_db}", help="Excluir esta versão", use_container_width=True, type="secondary"):
-                                    try:
-                                        crew = ReleaseNotesCrewAI()
-                                        crew.db.delete_version(version_name_db)
-                                        st.success(f"Versão {version_name_db} excluída com sucesso!")
-                                        st.rerun()
-                                    except Exception as e:
-                                        st.error(f"Erro ao excluir: {str(e)}")
-                        else:
-                            # Versão sem download (vazia)
-                            version_color = "#0066cc" if 'version_name' in locals() and version_name and version_name.strip() == version_name_db else "#333"
-                            
-                            version_html = f'''
-                            <div class="version-row">
-                                <div class="version-name" style="color: {version_color};">{version_name_db}</div>
-                                <div class="version-status">_Vazia_</div>
-                            </div>
-                            '''
-                            
-                            st.markdown(version_html, unsafe_allow_html=True)
-                            
-                            # Botões de ação em colunas
-                            col_edit, col_delete = st.columns([1, 1])
-                            
-                            with col_edit:
-                                if st.button("✏️ Editar", key=f"edit_empty_{version_name_db}", help="Editar esta versão", use_container_width=True):
-                                    st.session_state.editing_version = version_name_db
-                                    st.session_state.editing_content = "# Release Notes\n\nAdicione o conteúdo das release notes aqui..."
-                                    st.rerun()
-                            
-                            with col_delete:
-                                if st.button("🗑️ Excluir", key=f"delete_empty_{version_name_db}", help="Excluir esta versão", use_container_width=True, type="secondary"):
-                                    try:
-                                        crew = ReleaseNotesCrewAI()
-                                        crew.db.delete_version(version_name_db)
-                                        st.success(f"Versão {version_name_db} excluída com sucesso!")
-                                        st.rerun()
-                                    except Exception as e:
-                                        st.error(f"Erro ao excluir: {str(e)}")
-                    except:
-                        # Erro ao carregar - mostrar versão simples com botões de ação
-                        version_html = f'''
-                        <div class="version-row">
-                            <div class="version-name">{version_name_db}</div>
-                            <div class="version-status">_Erro ao carregar_</div>
+                    # Layout horizontal da versão
+                    version_color = "#0066cc" if 'version_name' in locals() and version_name and version_name.strip() == version_name_db else "#333"
+                    if not has_content:
+                        status_html = '<div class="version-status">_Vazia_</div>'
+                    elif DOWNLOAD_BASE_URL:
+                        # Link para o servidor de downloads: a página não carrega o conteúdo da versão
+                        status_html = f'''
+                        <div class="version-buttons">
+                            <a href="{download_url(DOWNLOAD_BASE_URL, version_name_db)}" class="version-btn download-btn" title="Baixar Release Notes">
+                                📥 Download
+                            </a>
                         </div>
                         '''
-                        
-                        st.markdown(version_html, unsafe_allow_html=True)
-                        
-                        # Botões de ação em colunas
-                        col_edit, col_delete = st.columns([1, 1])
-                        
-                        with col_edit:
-                            if st.button("✏️ Editar", key=f"edit_error_{version_name_db}", help="Editar esta versão", use_container_width=True):
-                                st.session_state.editing_version = version_name_db
+                    else:
+                        status_html = ""
+                    
+                    version_html = f'''
+                    <div class="version-row">
+                        <div class="version-name" style="color: {version_color};">{version_name_db}</div>
+                        {status_html}
+                    </div>
+                    '''
+                    
+                    st.markdown(version_html, unsafe_allow_html=True)
+                    
+                    if has_content and not DOWNLOAD_BASE_URL:
+                        # O markdown só é montado quando o usuário pede o download
+                        if st.session_state.get('download_version') == version_name_db:
+                            markdown_data = build_version_markdown(version_name_db, version_data['content_hash'])
+                            st.download_button(
+                                label="📥 Baixar .md",
+                                data=markdown_data,
+                                file_name=f"release_notes_{version_name_db}_{datetime.now().strftime('%Y%m%d_%H%M')}.md",
+                                mime="text/markdown",
+                                key=f"download_file_{version_name_db}",
+                                use_container_width=True
+                            )
+                        elif st.button("📥 Download", key=f"download_{version_name_db}", help="Baixar Release Notes", use_container_width=True):
+                            st.session_state.download_version = version_name_db
+                            st.rerun()
+                    
+                    # Botões de ação em colunas
+                    col_edit, col_delete = st.columns([1, 1])
+                    
+                    with col_edit:
+                        if st.button("✏️ Editar", key=f"edit_{version_name_db}", help="Editar esta versão", use_container_width=True):
+                            st.session_state.editing_version = version_name_db
+                            if has_content:
+                                st.session_state.editing_content = crew.get_collaborative_release_notes(version_name_db)
+                            else:
                                 st.session_state.editing_content = "# Release Notes\n\nAdicione o conteúdo das release notes aqui..."
+                            st.rerun()
+                    
+                    with col_delete:
+                        if st.button("🗑️ Excluir", key=f"delete_{version_name_db}", help="Excluir esta versão", use_container_width=True, type="secondary"):
+                            try:
+                                crew.db.delete_version(version_name_db)
+                                st.success(f"Versão {version_name_db} excluída com sucesso!")
                                 st.rerun()
-                        
-                        with col_delete:
-                            if st.button("🗑️ Excluir", key=f"delete_error_{version_name_db}", help="Excluir esta versão", use_container_width=True, type="secondary"):
-                                try:
-                                    crew = ReleaseNotesCrewAI()
-                                    crew.db.delete_version(version_name_db)
-                                    st.success(f"Versão {version_name_db} excluída com sucesso!")
-                                    st.rerun()
-                                except Exception as e:
-                                    st.error(f"Erro ao excluir: {str(e)}")
+                            except Exception as e:
+                                st.error(f"Erro ao excluir: {str(e)}")
                     
                     # Pequeno espaço entre versões
                     st.markdown("")
@@ -691,5 +754,14 @@ def main():
         except Exception as e:
             st.write("_Carregando versões..._")
 
+        # Tempos e contadores deste rerun (debug)
+        if DEBUG_PANEL:
+            render_debug_panel()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Mede cada rerun: operações do banco, chamadas ao LLM e pool de conexões
+    start_rerun()
+    try:
+        main()
+    finally:
+        finish_rerun()
\ No newline at end of file
@@ -0,0 +1 @@
+# Arquivo vazio para tornar o diretório um pacote Python
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""Benchmark de memória e tempo das consultas de entries do ReleaseNotesDB.
+
+Compara, em uma tabela release_entries com muitas linhas, o formato antigo
+(SELECT * + dict de 13 chaves por linha) com os registros (namedtuple)
+com todas as colunas e só com as colunas necessárias, além do
+generate_final_markdown. Memória = pico medido pelo tracemalloc.
+
+Uso:
+    python -m benchmarks.bench_entries_projection --rows 100000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from database.connection import connect
+from database.db_manager import ReleaseNotesDB
+
+LEGACY_KEYS = (
+    'id', 'jira_task_id', 'task_title', 'task_type', 'task_description', 'generated_content',
+    'evidence_image_name', 'evidence_image_data', 'developer_name', 'created_at', 'updated_at',
+    'sprint_version', 'status'
+)
+
+
+def seed(db, rows, content_length):
+    body = "x" * content_length
+    conn = connect(db.db_path)
+    try:
+        conn.executemany('''
+            INSERT INTO release_entries
+            (jira_task_id, task_title, task_type, task_description, generated_content, developer_name, sprint_version)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            (f"JBSV-{i}", f"Task {i}", "História" if i % 2 else "Bug", f"Descrição {i}", f"###[JBSV-{i}]\n\n{body}", "dev", "current")
+            for i in range(rows)
+        ))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def legacy_get_all_entries(db):
+    """Formato anterior: SELECT * e um dict por linha"""
+    conn = connect(db.db_path)
+    try:
+        return [
+            dict(zip(LEGACY_KEYS, row[:13]))
+            for row in conn.execute("SELECT * FROM release_entries ORDER BY created_at DESC").fetchall()
+        ]
+    finally:
+        conn.close()
+
+
+def profile(name, func, repeat):
+    """Melhor tempo entre `repeat` execuções e pico de memória de uma execução"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+        del result
+
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "benchmark": name,
+        "rows": len(result),
+        "best_ms": round(best * 1000, 3),
+        "peak_mb": round(peak / 1024 / 1024, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--content-length", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    db = ReleaseNotesDB(os.path.join(tempfile.mkdtemp(prefix="bench_entries_"), "release_notes.db"))
+    seed(db, args.rows, args.content_length)
+
+    cases = [
+        ("legacy_select_star_dicts", lambda: legacy_get_all_entries(db)),
+        ("get_all_entries_records", lambda: db.get_all_entries()),
+        ("get_all_entries_generated_content", lambda: db.get_all_entries(columns=('generated_content',))),
+        ("get_entries_by_type_id_title", lambda: db.get_entries_by_type("Bug", columns=('id', 'task_title'))),
+        ("generate_final_markdown", lambda: db.generate_final_markdown().splitlines()),
+    ]
+    for name, func in cases:
+        print(json.dumps(profile(name, func, args.repeat)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Benchmark do modelo de documento por seção (ReleaseNotesDocument).
+
+Mede, para versões com quantidades crescentes de tasks, o tempo de montar o
+documento inteiro e o de substituir uma única task e renderizar de novo.
+Os tempos por 1000 tasks devem ficar estáveis (crescimento linear).
+
+Uso:
+    python -m benchmarks.bench_markdown_document --sizes 1000 5000 20000
+"""
+import argparse
+import json
+import random
+import time
+
+from database.markdown_document import ReleaseNotesDocument, SECTION_ORDER
+
+
+def synthetic_rows(task_count, description_length=400, seed=42):
+    """Gera linhas (task_type, jira_task_id, generated_content) sintéticas"""
+    rng = random.Random(seed)
+    body = "x" * description_length
+    return [
+        (rng.choice(SECTION_ORDER), f"JBSV-{i}", f"###[JBSV-{i}] Task {i}\n\n{body}\n\n---")
+        for i in range(task_count)
+    ]
+
+
+def best_of(repeat, func):
+    """Menor tempo (em ms) entre `repeat` execuções"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(sizes, description_length=400, repeat=5):
+    results = []
+    for size in sizes:
+        rows = synthetic_rows(size, description_length)
+        document = ReleaseNotesDocument.from_rows(rows)
+        document.render()
+
+        def splice():
+            task_type, jira_task_id, content = rows[size // 2]
+            document.set_task(task_type, jira_task_id, content + " editado")
+            document.render()
+
+        build_ms = best_of(repeat, lambda: ReleaseNotesDocument.from_rows(rows).render())
+        splice_ms = best_of(repeat, splice)
+        results.append({
+            "tasks": size,
+            "build_ms": round(build_ms, 3),
+            "build_ms_per_1k_tasks": round(build_ms / size * 1000, 3),
+            "splice_render_ms": round(splice_ms, 3),
+            "splice_render_ms_per_1k_tasks": round(splice_ms / size * 1000, 3),
+            "markdown_bytes": len(document.render()),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000, 20000])
+    parser.add_argument("--description-length", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for result in run(args.sizes, args.description_length, args.repeat):
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
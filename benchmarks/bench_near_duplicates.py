@@ -0,0 +1,87 @@
+"""Benchmark da detecção de tasks quase duplicadas (MinHash/LSH).
+
+Popula um banco colaborativo temporário com tasks sintéticas e mede o tempo
+de find_near_duplicates para cópias exatas de tasks existentes, cópias com
+algumas palavras trocadas, cópias perto do limiar de similaridade e tasks
+novas, além da fração de cópias encontradas (recall). Nas cópias perto do
+limiar, o recall conta só as que têm similaridade estimada (comparando as
+assinaturas diretamente) acima de NEAR_DUPLICATE_THRESHOLD: mede quantos
+pares o LSH deixa de apontar como candidatos.
+
+Uso:
+    python -m benchmarks.bench_near_duplicates --tasks 5000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.bench_pipeline import measure, summarize
+from benchmarks.bench_retrieval import WORDS, synthetic_task
+from database.collaborative_db import CollaborativeReleaseNotesDB, NEAR_DUPLICATE_THRESHOLD
+from database.minhash import estimated_similarity, minhash_signature
+
+
+def mutate(rng, task, changes):
+    """Cópia da task com outro ID e `changes` palavras da descrição trocadas"""
+    words = task['jira_task_description'].split()
+    for _ in range(changes):
+        words[rng.randrange(len(words))] = rng.choice(WORDS)
+    return dict(task, jira_task_id=task['jira_task_id'] + "-COPIA", jira_task_description=" ".join(words))
+
+
+def signature_similarity(task, other):
+    """Similaridade estimada entre duas tasks, sem passar pelo LSH"""
+    return estimated_similarity(*(
+        minhash_signature(f"{item['jira_task_title']}\n{item['jira_task_description']}") for item in (task, other)
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=60, help="Palavras por descrição")
+    parser.add_argument("--changes", type=int, default=3, help="Palavras trocadas nas cópias")
+    parser.add_argument("--threshold-changes", type=int, default=15,
+                        help="Palavras trocadas nas cópias perto do limiar (~0,5 de similaridade com 60 palavras)")
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    db = CollaborativeReleaseNotesDB(os.path.join(tempfile.mkdtemp(prefix="bench_near_dup_"), "collaborative_release_notes.db"))
+    tasks = [synthetic_task(rng, i, args.words) for i in range(args.tasks)]
+    tasks_by_id = {task['jira_task_id']: task for task in tasks}
+    params = {"tasks": args.tasks, "words": args.words, "changes": args.changes}
+
+    start = time.perf_counter()
+    db.add_tasks("v1.0.0", tasks)
+    print(json.dumps({"benchmark": "add_tasks_with_signatures", "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+                      **params}), flush=True)
+
+    samples = rng.sample(tasks, min(args.lookups, len(tasks)))
+    copies = [mutate(rng, task, args.changes) for task in samples]
+    # Cópias perto do limiar: só contam as que estão de fato acima dele
+    threshold_copies = [
+        copy for copy in (mutate(rng, task, args.threshold_changes) for task in samples)
+        if signature_similarity(copy, tasks_by_id[copy['jira_task_id'].replace("-COPIA", "")]) >= NEAR_DUPLICATE_THRESHOLD
+    ]
+    fresh = [synthetic_task(rng, args.tasks + i, args.words) for i in range(len(samples))]
+
+    cases = (("exact_copy", samples), ("modified_copy", copies), ("threshold_copy", threshold_copies), ("new_task", fresh))
+    for name, queries in cases:
+        if not queries:
+            continue
+        results = []
+        query_iter = iter(queries)
+        times = measure(lambda: results.append(db.find_near_duplicates(next(query_iter), "v2.0.0")), len(queries))
+        found = sum(1 for query, matches in zip(queries, results)
+                    if any(match['jira_task_id'] == query['jira_task_id'].replace("-COPIA", "") for match in matches))
+        print(json.dumps(summarize(f"find_near_duplicates_{name}", times, recall=round(found / len(queries), 3),
+                                   avg_matches=round(sum(map(len, results)) / len(results), 2), **params)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Benchmark de ponta a ponta do fluxo de release notes.
+
+Popula um banco colaborativo com dados sintéticos (versões x tasks x tamanho
+da descrição) e mede as operações usadas pelo app: add_task,
+generate_collaborative_markdown (frio e com cache), get_version_stats,
+get_all_version_stats, list_all_versions, o custo do sidebar (resumo das
+versões + HTML) e o overhead do caminho do LLM com um backend stub (sem
+rede) e via HTTP contra o servidor fake.
+
+Cada medição é impressa como uma linha JSON, para comparar entre commits.
+Por padrão usa um banco temporário; com --db o banco indicado é populado
+(um banco que já tem versões só é aceito com --allow-existing, para não
+encher o banco do app com dados sintéticos).
+
+Uso:
+    python -m benchmarks.bench_pipeline --versions 20 --tasks 500 --description-length 800
+    python -m benchmarks.bench_pipeline --db /tmp/bench_pipeline.db --versions 5 --tasks 200
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+
+from agents.backends import LLMBackend, OpenAICompatibleBackend
+from agents.crew_requests import ReleaseNotesCrewAI
+from agents.fake_llm_server import fake_completion, fake_server_url, start_fake_server
+from database.collaborative_db import CollaborativeReleaseNotesDB
+from database.connection import connect
+from database.markdown_document import SECTION_ORDER, format_task_entry
+
+
+class StubBackend(LLMBackend):
+    """Backend em memória: responde na hora, com o mesmo texto do servidor fake"""
+
+    def complete(self, payload):
+        return fake_completion(payload["messages"][-1]["content"])
+
+    def stream(self, payload):
+        yield from self.complete(payload).split(" ")
+
+
+def synthetic_task(version_index, task_index, description_length):
+    body = ("Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * (description_length // 57 + 1))[:description_length]
+    task = {
+        'jira_task_id': f"JBSV-{version_index}{task_index:06d}",
+        'tipo_task': SECTION_ORDER[task_index % len(SECTION_ORDER)],
+        'jira_task_title': f"Task sintética {task_index} da versão {version_index}",
+        'jira_task_description': body,
+        'qa_level': task_index % 3,
+    }
+    task['generated_content'] = format_task_entry(task, body)
+    return task
+
+
+def version_name_for(version_index):
+    return f"v9.{version_index}.0"
+
+
+def seed(db, versions, tasks, description_length):
+    """Cria `versions` versões com `tasks` tasks cada (importação em lote)"""
+    start = time.perf_counter()
+    for v in range(versions):
+        db.add_tasks(version_name_for(v), [synthetic_task(v, t, description_length) for t in range(tasks)])
+    return time.perf_counter() - start
+
+
+def invalidate_markdown_cache(db):
+    """Descarta o markdown em cache (banco e memória) para medir a montagem a frio"""
+    conn = connect(db.db_path)
+    try:
+        conn.execute("UPDATE release_versions SET final_markdown = NULL")
+        conn.commit()
+    finally:
+        conn.close()
+    db._documents.clear()
+
+
+def measure(func, repeat, setup=None):
+    """Tempos (ms) de `repeat` execuções de func; setup roda antes de cada uma, fora da medição"""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def summarize(name, times, **extra):
+    result = {
+        "benchmark": name,
+        "runs": len(times),
+        "min_ms": round(min(times), 3),
+        "median_ms": round(statistics.median(times), 3),
+        "max_ms": round(max(times), 3),
+    }
+    result.update(extra)
+    return result
+
+
+def render_sidebar(db):
+    """Mesmo trabalho do sidebar do app, sem o Streamlit: resumo das versões + HTML de cada linha"""
+    rows = []
+    for version_data in db.get_versions_summary():
+        status = "" if version_data['task_count'] else '<div class="version-status">_Vazia_</div>'
+        rows.append(f'<div class="version-row"><div class="version-name">{version_data["version_name"]}</div>{status}</div>')
+    return rows
+
+
+def has_versions(db_path):
+    """True se o banco já existe e tem alguma versão"""
+    if not os.path.exists(db_path):
+        return False
+    # Somente leitura e sem o pool: os PRAGMAs do pool (WAL) alterariam o arquivo
+    conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    try:
+        return conn.execute("SELECT 1 FROM release_versions LIMIT 1").fetchone() is not None
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(db_path, versions, tasks, description_length, repeat, llm_calls):
+    db = CollaborativeReleaseNotesDB(db_path)
+    params = {"versions": versions, "tasks_per_version": tasks, "description_length": description_length}
+
+    seed_s = seed(db, versions, tasks, description_length)
+    yield {"benchmark": "seed", "elapsed_s": round(seed_s, 3), "tasks": versions * tasks, **params,
+           "commit": git_revision(), "python": platform.python_version()}
+
+    target = version_name_for(versions // 2)
+    counter = iter(range(10 ** 9))
+
+    def add_one():
+        task = synthetic_task(versions // 2, tasks + next(counter), description_length)
+        db.add_task(task, task['generated_content'], target)
+
+    yield summarize("add_task", measure(add_one, repeat), **params)
+    yield summarize("generate_collaborative_markdown_cold",
+                    measure(lambda: db.generate_collaborative_markdown(target), repeat, lambda: invalidate_markdown_cache(db)),
+                    markdown_bytes=len(db.generate_collaborative_markdown(target)), **params)
+    yield summarize("generate_collaborative_markdown_warm",
+                    measure(lambda: db.generate_collaborative_markdown(target), repeat), **params)
+    yield summarize("get_version_stats", measure(lambda: db.get_version_stats(target), repeat), **params)
+    yield summarize("get_all_version_stats", measure(db.get_all_version_stats, repeat), **params)
+    yield summarize("list_all_versions", measure(db.list_all_versions, repeat), **params)
+    yield summarize("sidebar", measure(lambda: render_sidebar(db), repeat), **params)
+
+    # Caminho do LLM sem rede: prompt, cache desativado e limpeza da resposta
+    task = synthetic_task(0, 0, description_length)
+    stub_crew = ReleaseNotesCrewAI(db=db, backend=StubBackend())
+    yield summarize("llm_stub_generate",
+                    measure(lambda: stub_crew.generate_simple_description(task, use_cache=False), llm_calls), **params)
+    yield summarize("llm_stub_stream",
+                    measure(lambda: "".join(stub_crew.stream_simple_description(task, use_cache=False)), llm_calls), **params)
+
+    # Mesmo caminho via HTTP (servidor fake local, keep-alive)
+    server = start_fake_server()
+    try:
+        http_crew = ReleaseNotesCrewAI(db=db, backend=OpenAICompatibleBackend(fake_server_url(server), "fake"))
+        yield summarize("llm_http_generate",
+                        measure(lambda: http_crew.generate_simple_description(task, use_cache=False), llm_calls), **params)
+        yield summarize("llm_http_stream",
+                        measure(lambda: "".join(http_crew.stream_simple_description(task, use_cache=False)), llm_calls), **params)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=None, help="Banco a popular (padrão: arquivo temporário)")
+    parser.add_argument("--allow-existing", action="store_true", help="Aceita um --db que já tem versões")
+    parser.add_argument("--versions", type=int, default=10)
+    parser.add_argument("--tasks", type=int, default=200, help="Tasks por versão")
+    parser.add_argument("--description-length", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--llm-calls", type=int, default=200)
+    args = parser.parse_args()
+    if args.db and not args.allow_existing and has_versions(args.db):
+        parser.error(f"{args.db} já tem versões; use um banco novo ou --allow-existing para populá-lo mesmo assim")
+
+    # Sem cache de respostas: toda chamada passa pelo backend
+    os.environ["LLM_CACHE_DISABLED"] = "1"
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="bench_pipeline_"), "collaborative_release_notes.db")
+    for result in run(db_path, args.versions, args.tasks, args.description_length, args.repeat, args.llm_calls):
+        print(json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()
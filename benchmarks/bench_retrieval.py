@@ -0,0 +1,82 @@
+"""Benchmark do índice BM25 de exemplos de estilo (agents/retrieval.py).
+
+Popula um banco colaborativo temporário com release notes sintéticas e mede
+a construção do índice, a consulta com o índice em memória, a atualização
+incremental depois de uma task nova e o carregamento do arquivo salvo.
+
+Uso:
+    python -m benchmarks.bench_retrieval --tasks 5000 --queries 200
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from agents.retrieval import Retriever, default_sources
+from benchmarks.bench_pipeline import measure, summarize
+from database.collaborative_db import CollaborativeReleaseNotesDB
+from database.markdown_document import SECTION_ORDER, format_task_entry
+
+WORDS = (
+    "pedido cliente rota carteira vendedor supervisor relatório pdf peso preço volume meta status "
+    "bloqueado tela listagem filtro exportação sincronização offline login cadastro produto estoque "
+    "desconto tabela cálculo valor unitário bottomsheet notificação mapa visita agenda pagamento boleto"
+).split()
+
+
+def synthetic_task(rng, index, words):
+    text = " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+    task = {
+        'jira_task_id': f"JBSV-{index:06d}",
+        'tipo_task': SECTION_ORDER[index % len(SECTION_ORDER)],
+        'jira_task_title': " ".join(rng.choice(WORDS) for _ in range(6)),
+        'jira_task_description': text,
+    }
+    task['generated_content'] = format_task_entry(task, text)
+    return task
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=60, help="Palavras por release note")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="bench_retrieval_")
+    db = CollaborativeReleaseNotesDB(os.path.join(workdir, "collaborative_release_notes.db"))
+    db.add_tasks("v1.0.0", [synthetic_task(rng, i, args.words) for i in range(args.tasks)])
+
+    index_path = os.path.join(workdir, "retrieval_index.npz")
+    params = {"tasks": args.tasks, "words": args.words}
+    queries = [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(args.queries)]
+
+    retriever = Retriever(index_path, default_sources(db.db_path))
+    start = time.perf_counter()
+    retriever.search(queries[0])
+    print(json.dumps({"benchmark": "build", "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+                      "chunks": len(retriever.chunks), "terms": len(retriever.vocab),
+                      "index_bytes": os.path.getsize(index_path), **params}), flush=True)
+
+    query_iter = iter(queries * 2)
+    print(json.dumps(summarize("search_warm", measure(lambda: retriever.search(next(query_iter)), args.queries), **params)), flush=True)
+
+    counter = iter(range(args.tasks, 10 ** 9))
+
+    def add_one():
+        task = synthetic_task(rng, next(counter), args.words)
+        db.add_task(task, task['generated_content'], "v1.0.0")
+
+    print(json.dumps(summarize("search_after_add_task",
+                               measure(lambda: retriever.search(queries[0]), 20, setup=add_one), **params)), flush=True)
+    print(json.dumps(summarize("load_from_disk",
+                               measure(lambda: Retriever(index_path, default_sources(db.db_path)).search(queries[0]), 5),
+                               **params)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Verifica a sessão HTTP compartilhada (agents/http_client.py) contra o servidor fake de LLM.
+
+Sobe agents.fake_llm_server em portas livres e confere que um 503 é repetido
+até dar certo, que um timeout de leitura é repetido uma única vez, que as
+chamadas reaproveitam a mesma conexão (keep-alive) e que os timeouts padrão
+são finitos. Falha (código de saída 1) se alguma verificação não passar.
+
+Uso:
+    python -m benchmarks.check_http_client
+"""
+import argparse
+import math
+import os
+import sys
+
+import requests
+
+from agents.fake_llm_server import fake_server_url, start_fake_server
+from agents.http_client import create_http_session, get_timeout
+
+PAYLOAD = {"model": "fake", "messages": [{"role": "user", "content": "Task ID: JBSV-1"}]}
+
+
+def post(session, server, timeout):
+    return session.post(fake_server_url(server), json=PAYLOAD, timeout=timeout)
+
+
+def run_with_server(check, **config):
+    """Executa check(server) com um servidor fake novo; retorna (passou, detalhe)"""
+    server = start_fake_server(**config)
+    try:
+        return check(server)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def check_retry_503(server):
+    response = post(create_http_session(), server, get_timeout())
+    stats = server.RequestHandlerClass.config.stats
+    return (
+        response.status_code == 200 and stats['errors'] == 2 and stats['requests'] == 3,
+        f"status {response.status_code}, {stats['requests']} requisições, {stats['errors']} com 503"
+    )
+
+
+def check_read_timeout_retried_once(server):
+    try:
+        post(create_http_session(), server, (get_timeout()[0], 0.2))
+        outcome = "respondeu sem timeout"
+    except requests.RequestException as e:
+        outcome = type(e).__name__
+    requests_made = server.RequestHandlerClass.config.stats['requests']
+    return requests_made == 2, f"{requests_made} requisições ({outcome})"
+
+
+def check_keep_alive(server):
+    session = create_http_session()
+    statuses = [post(session, server, get_timeout()).status_code for _ in range(3)]
+    connections = server.RequestHandlerClass.config.stats['connections']
+    return statuses == [200] * 3 and connections == 1, f"3 chamadas, {connections} conexão(ões) TCP"
+
+
+def check_default_timeouts(_server=None):
+    saved = {name: os.environ.pop(name, None) for name in ("GROQ_CONNECT_TIMEOUT", "GROQ_READ_TIMEOUT")}
+    try:
+        timeout = get_timeout()
+    finally:
+        os.environ.update({name: value for name, value in saved.items() if value is not None})
+    bounded = all(value is not None and 0 < value < math.inf for value in timeout)
+    return bounded, f"(conexão, leitura) = {timeout}"
+
+
+CHECKS = {
+    'retry_503': (check_retry_503, {'fail_first': 2}),
+    'read_timeout_retried_once': (check_read_timeout_retried_once, {'latency': 0.5}),
+    'keep_alive': (check_keep_alive, {}),
+    'default_timeouts': (check_default_timeouts, None),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args()
+
+    failures = 0
+    for name, (check, config) in CHECKS.items():
+        passed, detail = check() if config is None else run_with_server(check, **config)
+        print(f"{'ok' if passed else 'FALHA'}  {name}: {detail}")
+        failures += not passed
+
+    print(f"{failures} verificação(ões) com problema" if failures else "Sessão HTTP ok")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
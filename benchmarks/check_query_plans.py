@@ -0,0 +1,91 @@
+"""Verifica o plano (EXPLAIN QUERY PLAN) das consultas frequentes do banco colaborativo.
+
+Falha (código de saída 1) se alguma consulta voltar a varrer uma tabela sem
+índice ou a ordenar/agrupar com uma B-tree temporária. As listagens de
+versões podem percorrer release_versions inteira, desde que pelo índice de
+created_at.
+
+Uso:
+    python -m benchmarks.check_query_plans
+    python -m benchmarks.check_query_plans --db collaborative_release_notes.db
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+
+from database import collaborative_db
+from database.collaborative_db import CollaborativeReleaseNotesDB
+from database.connection import connect
+
+# nome -> (SQL, parâmetros, tabelas que podem ser percorridas inteiras via índice)
+HOT_QUERIES = {
+    'load_document': (collaborative_db.LOAD_DOCUMENT_SQL, (1,), ()),
+    'stream_sections': (collaborative_db.STREAM_SECTIONS_SQL, (1, 4), ()),
+    'first_manual_edit': (collaborative_db.FIRST_MANUAL_EDIT_SQL, (1, 5, 'MANUAL_EDIT'), ()),
+    'has_tasks': (collaborative_db.HAS_TASKS_SQL, (1,), ()),
+    'version_stats': (collaborative_db.VERSION_STATS_BY_NAME_SQL, ('v1.0.0',), ()),
+    'all_version_stats': (collaborative_db.ALL_VERSION_STATS_SQL, (), ('release_versions',)),
+    'active_version': (collaborative_db.ACTIVE_VERSION_SQL, (), ()),
+    'list_versions': (collaborative_db.LIST_VERSIONS_SQL, (), ('release_versions',)),
+    'all_versions': (collaborative_db.ALL_VERSIONS_SQL, (), ('release_versions',)),
+    'versions_summary': (collaborative_db.VERSIONS_SUMMARY_SQL, (), ('release_versions',)),
+    'task_ids': (collaborative_db.TASK_IDS_SQL, ('v1.0.0',), ()),
+    'near_duplicate_candidates': (collaborative_db.NEAR_DUPLICATE_CANDIDATES_SQL, tuple(range(collaborative_db.LSH_BANDS)), ()),
+}
+
+SCAN_PATTERN = re.compile(r"^SCAN (\w+)(?: AS \w+)?(.*)$")
+
+
+def plan_problems(conn, sql, params, allowed_scans):
+    """Retorna (linhas do plano, problemas encontrados)"""
+    aliases = {alias: table for table, alias in re.findall(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", sql, re.IGNORECASE) if alias}
+    details = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+    problems = []
+    for detail in details:
+        if "TEMP B-TREE" in detail:
+            problems.append(f"B-tree temporária: {detail}")
+            continue
+        match = SCAN_PATTERN.match(detail)
+        if match and detail != "SCAN CONSTANT ROW":
+            table = aliases.get(match.group(1), match.group(1))
+            uses_index = "USING INDEX" in match.group(2) or "USING COVERING INDEX" in match.group(2)
+            if not (uses_index and table in allowed_scans):
+                problems.append(f"Varredura completa: {detail}")
+    return details, problems
+
+
+def check(db_path):
+    # Garante o schema atual (migrações) antes de inspecionar os planos
+    CollaborativeReleaseNotesDB(db_path)
+    conn = connect(db_path)
+    failures = 0
+    try:
+        for name, (sql, params, allowed_scans) in HOT_QUERIES.items():
+            details, problems = plan_problems(conn, sql, params, allowed_scans)
+            print(f"{'FALHA' if problems else 'ok'}  {name}")
+            for detail in details:
+                print(f"      {detail}")
+            for problem in problems:
+                print(f"   -> {problem}")
+            failures += bool(problems)
+    finally:
+        conn.close()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=None, help="Banco a verificar (padrão: banco temporário vazio)")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="query_plans_"), "collaborative_release_notes.db")
+    failures = check(db_path)
+    print(f"{failures} consulta(s) com problema" if failures else "Todas as consultas usam índices")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Teste de carga do fluxo gerar descrição -> add_task -> generate_collaborative_markdown.
+
+Sobe o servidor fake de LLM (agents.fake_llm_server) em uma porta livre e usa
+um banco temporário, então roda sem rede e sem tocar no banco do app. O cache
+de respostas do LLM é ignorado para que toda task passe pelo servidor.
+
+Uso:
+    python -m benchmarks.load_test_pipeline --tasks 2000 --concurrency 16
+    python -m benchmarks.load_test_pipeline --latency 0.2 --error-rate 0.02 --stream
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.backends import OpenAICompatibleBackend
+from agents.crew_requests import ReleaseNotesCrewAI
+from agents.fake_llm_server import fake_server_url, start_fake_server
+from database.collaborative_db import CollaborativeReleaseNotesDB
+from database.connection import get_pool
+from database.markdown_document import SECTION_ORDER, format_task_entry
+
+
+def synthetic_tasks(task_count):
+    """Tasks sintéticas com os campos obrigatórios do app"""
+    return [
+        {
+            'jira_task_id': f"JBSV-{i}",
+            'tipo_task': SECTION_ORDER[i % len(SECTION_ORDER)],
+            'jira_task_title': f"Task sintética {i}",
+            'jira_task_description': f"Descrição da task sintética {i} para teste de carga.",
+            'qa_level': i % 3,
+        }
+        for i in range(task_count)
+    ]
+
+
+def check_stream_encoding(crew):
+    """Confere que o streaming devolve o mesmo texto, com acentos, que a chamada sem streaming"""
+    task = dict(synthetic_tasks(1)[0], jira_task_title="Relatório de comissão do usuário")
+    streamed = crew._clean_response("".join(crew.stream_simple_description(task, use_cache=False)))
+    expected = crew.generate_simple_description(task, use_cache=False)
+    return streamed == expected and not streamed.isascii()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def run(task_count, concurrency, stream=False, version_name="v0.0.1-load", **server_config):
+    server = start_fake_server(**server_config)
+    tmp_dir = tempfile.mkdtemp(prefix="load_test_")
+    try:
+        db = CollaborativeReleaseNotesDB(os.path.join(tmp_dir, "load_test.db"))
+        crew = ReleaseNotesCrewAI(db=db, backend=OpenAICompatibleBackend(fake_server_url(server), "fake"))
+        latencies = {'llm': [], 'add_task': [], 'markdown': []}
+        errors = []
+        lock = threading.Lock()
+
+        # Texto acentuado corrompido no streaming (decodificação errada do SSE) conta como erro
+        stream_encoding_ok = check_stream_encoding(crew) if stream else None
+        if stream_encoding_ok is False:
+            errors.append("Streaming devolveu texto diferente da chamada sem streaming (codificação do SSE)")
+
+        def process(task_data):
+            try:
+                start = time.perf_counter()
+                if stream:
+                    description = crew._clean_response("".join(crew.stream_simple_description(task_data, use_cache=False)))
+                else:
+                    description = crew.generate_simple_description(task_data, use_cache=False)
+                llm_done = time.perf_counter()
+                db.add_task(task_data, format_task_entry(task_data, description), version_name)
+                add_done = time.perf_counter()
+                db.generate_collaborative_markdown(version_name)
+                markdown_done = time.perf_counter()
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                return
+
+            with lock:
+                latencies['llm'].append(llm_done - start)
+                latencies['add_task'].append(add_done - llm_done)
+                latencies['markdown'].append(markdown_done - add_done)
+
+        tasks = synthetic_tasks(task_count)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(process, tasks))
+        elapsed = time.perf_counter() - start
+
+        stats = db.get_version_stats(version_name)
+        result = {
+            "tasks": task_count,
+            "concurrency": concurrency,
+            "stream": stream,
+            "stream_encoding_ok": stream_encoding_ok,
+            "elapsed_s": round(elapsed, 3),
+            "tasks_per_s": round(task_count / elapsed, 1),
+            "errors": len(errors),
+            "tasks_in_db": stats['total'],
+            "server": dict(server.RequestHandlerClass.config.stats),
+        }
+        for stage, values in latencies.items():
+            result[f"{stage}_p50_ms"] = round(percentile(values, 0.5) * 1000, 3)
+            result[f"{stage}_p95_ms"] = round(percentile(values, 0.95) * 1000, 3)
+        if errors:
+            result["first_error"] = errors[0]
+        return result
+    finally:
+        server.shutdown()
+        server.server_close()
+        # Fecha as conexões do pool antes de apagar o banco, o WAL, o cache do LLM e o índice de exemplos
+        get_pool().close_all()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--stream", action="store_true", help="Usa o modo streaming (SSE)")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # O pool HTTP acompanha a concorrência do teste
+    os.environ.setdefault("GROQ_MAX_CONCURRENCY", str(args.concurrency))
+
+    print(json.dumps(run(
+        args.tasks, args.concurrency, stream=args.stream, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, seed=args.seed
+    )))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""Linha de comando do gerador de release notes.
+
+Exemplos:
+    python cli.py import --version v4.21.0 tasks.csv
+    python cli.py generate --version v4.21.0 tasks.csv --concurrency 8
+    python cli.py --db outro_banco.db import --version v4.21.0 workitems.json
+    python cli.py export --version v4.21.0 --out notes.md
+    python cli.py stats
+    python cli.py search "peso pdf"
+
+Não importa o Streamlit: os módulos pesados só são carregados pelo comando que os usa.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from pathlib import Path
+
+DEFAULT_DB_PATH = "collaborative_release_notes.db"
+
+# Nomes de colunas aceitos nas exportações de work items (Azure DevOps / Jira) -> campos internos
+FIELD_ALIASES = {
+    'id': 'jira_task_id',
+    'task_id': 'jira_task_id',
+    'jira_task_id': 'jira_task_id',
+    'work item type': 'tipo_task',
+    'type': 'tipo_task',
+    'tipo': 'tipo_task',
+    'tipo_task': 'tipo_task',
+    'title': 'jira_task_title',
+    'titulo': 'jira_task_title',
+    'jira_task_title': 'jira_task_title',
+    'description': 'jira_task_description',
+    'descricao': 'jira_task_description',
+    'jira_task_description': 'jira_task_description',
+    'generated_content': 'generated_content',
+    'release_note': 'generated_content',
+    'qa_level': 'qa_level',
+    'tfs_link': 'tfs_link',
+    'link': 'tfs_link',
+    'evidence_image': 'evidence_image',
+}
+
+
+def load_tasks_file(path):
+    """Lê as tasks de um arquivo CSV ou JSON (lista de objetos ou {"tasks": [...]})"""
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get("tasks", [])
+        return data
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return list(csv.DictReader(f))
+
+
+def normalize_task(record):
+    """Converte um registro exportado para o formato de task_data usado pelo banco"""
+    from database.markdown_document import canonical_task_type, format_task_entry
+
+    task = {}
+    for key, value in record.items():
+        field = FIELD_ALIASES.get(str(key).strip().lower())
+        if field and value not in (None, ""):
+            task[field] = value.strip() if isinstance(value, str) else value
+
+    # IDs numéricos seguem o mesmo formato do app (JBSV-XXXX)
+    task_id = str(task.get('jira_task_id', ''))
+    if task_id.isdigit():
+        task_id = f"JBSV-{task_id}"
+    if task_id:
+        task['jira_task_id'] = task_id
+
+    # Tipos aceitos pelo app, incluindo os nomes antigos (ex.: História -> User Story)
+    task_type = canonical_task_type(task.get('tipo_task'))
+    if task_type:
+        task['tipo_task'] = task_type
+
+    # Sem conteúdo gerado, a própria descrição vira o corpo da release note
+    if not task.get('generated_content') and task.get('jira_task_id') and task.get('jira_task_description'):
+        task['generated_content'] = format_task_entry(task, task['jira_task_description'])
+
+    return task
+
+
+def normalize_version_name(version_name):
+    """Aplica o mesmo formato de versão do app (prefixo 'v')"""
+    version_name = version_name.strip()
+    return version_name if version_name.startswith('v') else f"v{version_name}"
+
+
+def cmd_import(args):
+    """Importa um arquivo de tasks para uma versão em uma única transação"""
+    from database.collaborative_db import CollaborativeReleaseNotesDB
+
+    db = CollaborativeReleaseNotesDB(args.db)
+    tasks = [normalize_task(record) for record in load_tasks_file(args.file)]
+    version_name = normalize_version_name(args.version)
+    report = db.add_tasks(version_name, tasks)
+
+    print(f"Versão {version_name}: {report['inserted']} tasks novas, {len(report['replaced'])} substituídas")
+    if report['replaced']:
+        print(f"  Substituídas (já existiam na versão): {', '.join(report['replaced'])}")
+    if report['duplicates']:
+        print(f"  Repetidas no arquivo (vale a última): {', '.join(report['duplicates'])}")
+    for error in report['errors']:
+        print(f"  Linha {error['row'] + 1} ignorada: {error['error']}", file=sys.stderr)
+
+    return 1 if report['errors'] else 0
+
+
+def cmd_generate(args):
+    """Gera as descrições via IA em paralelo e grava cada task assim que fica pronta"""
+    from agents.crew_requests import ReleaseNotesCrewAI
+    from database.collaborative_db import get_collaborative_db
+    from database.markdown_document import SECTION_ORDER, format_task_entry
+
+    db = get_collaborative_db(args.db)
+    crew = ReleaseNotesCrewAI(db=db)
+    version_name = normalize_version_name(args.version)
+
+    # Retomável: as tasks já gravadas na versão (de uma execução interrompida) são puladas
+    done_ids = set() if args.force else db.get_task_ids(version_name)
+
+    tasks = []
+    skipped = 0
+    for index, record in enumerate(load_tasks_file(args.file)):
+        task = normalize_task(record)
+        task.pop('generated_content', None)
+        missing = [field for field in ('jira_task_id', 'tipo_task', 'jira_task_title', 'jira_task_description') if not task.get(field)]
+        if missing:
+            print(f"Linha {index + 1} ignorada: Campos obrigatórios ausentes: {', '.join(missing)}", file=sys.stderr)
+            continue
+        if task['tipo_task'] not in SECTION_ORDER:
+            print(f"Linha {index + 1} ignorada: Tipo de task desconhecido: {task['tipo_task']} (aceitos: {', '.join(SECTION_ORDER)})", file=sys.stderr)
+            continue
+        if task['jira_task_id'] in done_ids:
+            skipped += 1
+            continue
+        tasks.append(task)
+
+    if skipped:
+        print(f"{skipped} tasks já estão na versão {version_name} e foram puladas (use --force para gerar de novo)")
+
+    failures = 0
+    for done, (_, task, description, error) in enumerate(crew.generate_descriptions_batch(tasks, args.concurrency), start=1):
+        prefix = f"[{done}/{len(tasks)}] {task['jira_task_id']}"
+        if error is None and not db.add_task(task, format_task_entry(task, description), version_name):
+            error = "falha ao gravar no banco"
+        if error:
+            failures += 1
+            print(f"{prefix} ERRO: {error}", file=sys.stderr)
+            continue
+        print(f"{prefix} ok")
+        if args.verbose:
+            print(f"    {description}")
+
+    print(f"Versão {version_name}: {len(tasks) - failures} tasks geradas, {failures} com erro, {skipped} já existentes")
+    return 1 if failures else 0
+
+
+def cmd_export(args):
+    """Exporta o markdown de uma versão em streaming (memória limitada, mesmo para versões enormes)"""
+    from database.collaborative_db import CollaborativeReleaseNotesDB
+
+    db = CollaborativeReleaseNotesDB(args.db)
+    version_name = normalize_version_name(args.version)
+    version_id, _ = db.get_version_if_exists(version_name)
+    if not version_id:
+        print(f"Versão {version_name} não encontrada", file=sys.stderr)
+        return 1
+
+    chunks = db.iter_collaborative_markdown(version_name)
+    if args.out == "-":
+        for chunk in chunks:
+            sys.stdout.write(chunk)
+        sys.stdout.flush()
+        return 0
+
+    # Grava em um arquivo temporário e renomeia: o arquivo de saída nunca fica pela metade
+    tmp_path = f"{args.out}.tmp"
+    written = 0
+    try:
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+        os.replace(tmp_path, args.out)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+    print(f"Versão {version_name} exportada para {args.out} ({written} caracteres)", file=sys.stderr)
+    return 0
+
+
+def cmd_stats(args):
+    """Mostra a quantidade de tasks por tipo de uma versão ou de todas"""
+    from database.collaborative_db import CollaborativeReleaseNotesDB
+
+    db = CollaborativeReleaseNotesDB(args.db)
+    if args.version:
+        version_name = normalize_version_name(args.version)
+        if not db.get_version_if_exists(version_name)[0]:
+            print(f"Versão {version_name} não encontrada", file=sys.stderr)
+            return 1
+        all_stats = {version_name: db.get_version_stats(version_name)}
+    else:
+        all_stats = db.get_all_version_stats()
+
+    if args.json:
+        print(json.dumps(all_stats, ensure_ascii=False, indent=2))
+        return 0
+
+    columns = ('total', 'user_stories', 'bugs', 'improvements', 'technical_debts')
+    headers = ('Versão', 'Total', 'User Stories', 'Bugs', 'Improvements', 'Technical Debt')
+    rows = [[version_name] + [str(stats[column]) for column in columns] for version_name, stats in all_stats.items()]
+    widths = [max(len(row[i]) for row in [headers] + rows) for i in range(len(headers))]
+    for row in [headers] + rows:
+        print("  ".join(value.ljust(width) if i == 0 else value.rjust(width) for i, (value, width) in enumerate(zip(row, widths))))
+    return 0
+
+
+def cmd_search(args):
+    """Busca tasks em todas as versões e mostra as mais relevantes com os termos destacados"""
+    from database.collaborative_db import CollaborativeReleaseNotesDB, HIGHLIGHT_START, HIGHLIGHT_END
+
+    db = CollaborativeReleaseNotesDB(args.db)
+    results = db.search_tasks(args.query, limit=args.limit)
+    if args.json:
+        for result in results:
+            for field in ('title', 'snippet'):
+                result[field] = (result[field] or "").replace(HIGHLIGHT_START, "").replace(HIGHLIGHT_END, "")
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return 0
+
+    # Negrito no terminal; em arquivos/pipes, os termos ficam entre asteriscos
+    start, end = ("\033[1m", "\033[0m") if sys.stdout.isatty() else ("*", "*")
+
+    # Quebras de linha (inclusive as gravadas como '\n' literal em entradas antigas) viram espaços
+    def highlight(text):
+        return (text or "").replace(HIGHLIGHT_START, start).replace(HIGHLIGHT_END, end).replace("\\n", " ").replace("\n", " ")
+
+    if not results:
+        print("Nenhuma task encontrada", file=sys.stderr)
+        return 1
+    for result in results:
+        print(f"{result['version_name']}  {result['jira_task_id']}  [{result['task_type']}]  {highlight(result['title'])}")
+        print(f"    {highlight(result['snippet'])}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Gerador de release notes - linha de comando")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Caminho do banco SQLite colaborativo")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Importa tasks de um arquivo CSV/JSON para uma versão")
+    import_parser.add_argument("file", help="Arquivo .csv ou .json com as tasks")
+    import_parser.add_argument("--version", required=True, help="Nome da versão (ex: v4.21.0)")
+    import_parser.set_defaults(func=cmd_import)
+
+    generate_parser = subparsers.add_parser("generate", help="Gera as release notes via IA para as tasks de um arquivo CSV/JSON")
+    generate_parser.add_argument("file", help="Arquivo .csv ou .json com as tasks")
+    generate_parser.add_argument("--version", required=True, help="Nome da versão (ex: v4.21.0)")
+    generate_parser.add_argument("--concurrency", type=int, default=None, help="Chamadas simultâneas à API (padrão: GROQ_MAX_CONCURRENCY ou 4)")
+    generate_parser.add_argument("--verbose", action="store_true", help="Mostra cada descrição gerada")
+    generate_parser.add_argument("--force", action="store_true", help="Gera de novo as tasks que já estão na versão")
+    generate_parser.set_defaults(func=cmd_generate)
+
+    export_parser = subparsers.add_parser("export", help="Exporta o markdown de uma versão para um arquivo")
+    export_parser.add_argument("--version", required=True, help="Nome da versão (ex: v4.21.0)")
+    export_parser.add_argument("--out", default="-", help="Arquivo de saída (padrão: saída padrão)")
+    export_parser.set_defaults(func=cmd_export)
+
+    stats_parser = subparsers.add_parser("stats", help="Mostra a quantidade de tasks por tipo de cada versão")
+    stats_parser.add_argument("--version", default=None, help="Só esta versão (padrão: todas)")
+    stats_parser.add_argument("--json", action="store_true", help="Saída em JSON")
+    stats_parser.set_defaults(func=cmd_stats)
+
+    search_parser = subparsers.add_parser("search", help="Busca tasks por ID, título ou texto em todas as versões")
+    search_parser.add_argument("query", help="Termos da busca (o último vale como prefixo)")
+    search_parser.add_argument("--limit", type=int, default=20, help="Máximo de resultados")
+    search_parser.add_argument("--json", action="store_true", help="Saída em JSON")
+    search_parser.set_defaults(func=cmd_search)
+
+    return parser
+
+
+def main(argv=None):
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass  # dotenv é opcional
+
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import hashlib
+import mmap
+import os
+import tempfile
+from pathlib import Path
+
+
+def blob_dir_for(db_path):
+    """Diretório de blobs de um banco: <nome do banco>_blobs, ao lado do arquivo"""
+    path = Path(db_path)
+    return path.with_name(f"{path.stem}_blobs")
+
+
+class BlobRef:
+    """Referência preguiçosa a um blob: o conteúdo só é lido do disco quando pedido"""
+
+    __slots__ = ('store', 'hash')
+
+    def __init__(self, store, blob_hash):
+        self.store = store
+        self.hash = blob_hash
+
+    @property
+    def path(self):
+        return self.store.path(self.hash)
+
+    def read(self):
+        """Conteúdo completo do blob"""
+        return self.store.read(self.hash)
+
+    def mmap(self):
+        """Mapeia o arquivo em memória (somente leitura); feche o objeto retornado ao terminar"""
+        return self.store.mmap(self.hash)
+
+    def __bytes__(self):
+        return self.read()
+
+    def __len__(self):
+        return os.path.getsize(self.path)
+
+    def __eq__(self, other):
+        return isinstance(other, BlobRef) and other.hash == self.hash
+
+    def __hash__(self):
+        return hash(self.hash)
+
+    def __repr__(self):
+        return f"BlobRef({self.hash[:12]})"
+
+
+class BlobStore:
+    """Armazena arquivos binários endereçados pelo SHA-256 do conteúdo.
+
+    Cada blob fica em <raiz>/<2 primeiros>/<2 seguintes>/<hash>. Conteúdos iguais
+    viram um único arquivo, e um blob nunca muda depois de gravado.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def path(self, blob_hash):
+        return self.root / blob_hash[:2] / blob_hash[2:4] / blob_hash
+
+    def put(self, data):
+        """Grava o conteúdo (se ainda não existir) e retorna o hash"""
+        blob_hash = hashlib.sha256(data).hexdigest()
+        path = self.path(blob_hash)
+        if path.exists():
+            return blob_hash
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Grava em arquivo temporário e renomeia: leitores nunca veem um blob pela metade
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return blob_hash
+
+    def ref(self, blob_hash):
+        """BlobRef para um hash (None se o hash for vazio)"""
+        return BlobRef(self, blob_hash) if blob_hash else None
+
+    def exists(self, blob_hash):
+        return self.path(blob_hash).exists()
+
+    def read(self, blob_hash):
+        return self.path(blob_hash).read_bytes()
+
+    def mmap(self, blob_hash):
+        """Mapeia o blob em memória; blobs vazios não podem ser mapeados e retornam b''"""
+        with open(self.path(blob_hash), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def delete(self, blob_hash):
+        try:
+            self.path(blob_hash).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    def iter_hashes(self):
+        """Hashes de todos os blobs gravados"""
+        if not self.root.exists():
+            return
+        for path in self.root.glob("*/*/*"):
+            if path.is_file() and not path.name.startswith(".tmp-"):
+                yield path.name
+
+    def remove_unreferenced(self, referenced_hashes):
+        """Apaga os blobs que não estão em `referenced_hashes`; retorna quantos foram apagados"""
+        referenced = set(referenced_hashes)
+        removed = 0
+        for blob_hash in list(self.iter_hashes()):
+            if blob_hash not in referenced and self.delete(blob_hash):
+                removed += 1
+        return removed
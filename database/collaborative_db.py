@@ -1,39 +1,146 @@
 import sqlite3
 import json
+import hashlib
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
-import streamlit as st
+from database.reporting import report_error
+from database.connection import connect
+from database.migrations import apply_migrations
+from database.markdown_document import (
+    ReleaseNotesDocument, section_rank, canonical_task_type, SECTION_ORDER, MANUAL_EDIT_TYPE, OTHER_SECTION_RANK,
+    MARKDOWN_HEADER, EMPTY_MARKDOWN
+)
+from database.minhash import minhash_signature, band_keys, signature_from_blob, estimated_similarity, LSH_BANDS
+from instrumentation import profiled
 
-class CollaborativeReleaseNotesDB:
-    def __init__(self, db_path="collaborative_release_notes.db"):
-        self.db_path = db_path
-        self.init_database()
+# Tamanho (em caracteres) dos pedaços produzidos pela exportação em streaming
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Quantidade de versões cujo documento por seção fica em memória
+MAX_CACHED_DOCUMENTS = 16
+
+# Campos obrigatórios de cada task na importação em lote
+TASK_REQUIRED_FIELDS = ('jira_task_id', 'tipo_task', 'jira_task_title', 'jira_task_description', 'generated_content')
+
+# Marcadores dos termos encontrados na busca (caracteres de controle: não aparecem no conteúdo)
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+# Índice de busca textual: tabela FTS5 de conteúdo externo, sincronizada com tasks por triggers
+SEARCH_INDEX_DDL = (
+    '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+            jira_task_id, task_title, task_description, generated_content,
+            content='tasks', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    ''',
+    '''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts (rowid, jira_task_id, task_title, task_description, generated_content)
+            VALUES (new.id, new.jira_task_id, new.task_title, new.task_description, new.generated_content);
+        END
+    ''',
+    '''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, jira_task_id, task_title, task_description, generated_content)
+            VALUES ('delete', old.id, old.jira_task_id, old.task_title, old.task_description, old.generated_content);
+        END
+    ''',
+    '''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, jira_task_id, task_title, task_description, generated_content)
+            VALUES ('delete', old.id, old.jira_task_id, old.task_title, old.task_description, old.generated_content);
+            INSERT INTO tasks_fts (rowid, jira_task_id, task_title, task_description, generated_content)
+            VALUES (new.id, new.jira_task_id, new.task_title, new.task_description, new.generated_content);
+        END
+    ''',
+)
+
+
+def _create_search_index(conn):
+    """Cria o índice FTS5 e indexa as tasks existentes (sem FTS5 no SQLite, a busca usa LIKE)"""
+    try:
+        conn.execute(SEARCH_INDEX_DDL[0])
+    except sqlite3.OperationalError:
+        return
+    for statement in SEARCH_INDEX_DDL[1:]:
+        conn.execute(statement)
+    conn.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+
+
+# Similaridade estimada (Jaccard) a partir da qual uma task é apontada como possível duplicata.
+# As faixas do LSH (database/minhash.py) são dimensionadas para encontrar quase todos os pares neste limiar
+NEAR_DUPLICATE_THRESHOLD = 0.5
+
+# Detecção de quase duplicatas: assinatura MinHash de cada task e seus baldes LSH (uma linha por faixa)
+NEAR_DUPLICATE_DDL = (
+    '''
+        CREATE TABLE IF NOT EXISTS task_signatures (
+            task_id INTEGER PRIMARY KEY,
+            signature BLOB NOT NULL
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS task_lsh_bands (
+            band_key INTEGER NOT NULL,
+            task_id INTEGER NOT NULL,
+            PRIMARY KEY (band_key, task_id)
+        ) WITHOUT ROWID
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_task_lsh_bands_task ON task_lsh_bands (task_id)",
+    '''
+        CREATE TRIGGER IF NOT EXISTS tasks_minhash_delete AFTER DELETE ON tasks BEGIN
+            DELETE FROM task_signatures WHERE task_id = old.id;
+            DELETE FROM task_lsh_bands WHERE task_id = old.id;
+        END
+    ''',
+)
+
+SIGNATURE_SOURCE_SQL = "SELECT id, task_type, task_title, task_description FROM tasks"
+
+
+def _store_signatures(cursor, rows):
+    """Grava a assinatura MinHash e os baldes LSH de linhas (id, task_type, task_title, task_description)"""
+    signature_rows = []
+    band_rows = []
+    for task_id, task_type, task_title, task_description in rows:
+        if task_type == MANUAL_EDIT_TYPE:
+            continue
+        signature = minhash_signature(f"{task_title}\n{task_description}")
+        if signature is None:
+            continue
+        signature_rows.append((task_id, signature.tobytes()))
+        band_rows.extend((key, task_id) for key in band_keys(signature))
     
-    def clear_database(self):
-        """Limpa todos os dados do banco de dados"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Deletar todas as tasks primeiro (devido à foreign key)
-        cursor.execute("DELETE FROM tasks")
-        
-        # Deletar todas as versões
-        cursor.execute("DELETE FROM release_versions")
-        
-        # Resetar os auto-increment counters
-        cursor.execute("DELETE FROM sqlite_sequence WHERE name IN ('tasks', 'release_versions')")
-        
-        conn.commit()
-        conn.close()
-        print("Banco de dados limpo com sucesso!")
+    cursor.executemany("INSERT OR REPLACE INTO task_signatures (task_id, signature) VALUES (?, ?)", signature_rows)
+    cursor.executemany("INSERT OR IGNORE INTO task_lsh_bands (band_key, task_id) VALUES (?, ?)", band_rows)
 
-    def init_database(self):
-        """Inicializa o banco de dados colaborativo"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+
+def _create_near_duplicate_index(conn):
+    """Cria as tabelas de assinaturas e calcula as assinaturas das tasks existentes"""
+    for statement in NEAR_DUPLICATE_DDL:
+        conn.execute(statement)
+    _store_signatures(conn, conn.execute(SIGNATURE_SOURCE_SQL).fetchall())
+
+
+def _rebuild_lsh_bands(conn):
+    """Recalcula os baldes LSH a partir das assinaturas gravadas (após mudar LSH_BANDS/LSH_ROWS)"""
+    conn.execute("DELETE FROM task_lsh_bands")
+    signatures = conn.execute("SELECT task_id, signature FROM task_signatures").fetchall()
+    conn.executemany(
+        "INSERT OR IGNORE INTO task_lsh_bands (band_key, task_id) VALUES (?, ?)",
+        [(key, task_id) for task_id, blob in signatures for key in band_keys(signature_from_blob(blob))]
+    )
+
+
+# Migrações do schema, na ordem; o índice + 1 corresponde ao PRAGMA user_version
+MIGRATIONS = [
+    # v1: schema inicial
+    (
         # Tabela para versões de release
-        cursor.execute('''
+        '''
             CREATE TABLE IF NOT EXISTS release_versions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 version_name TEXT UNIQUE NOT NULL,
@@ -41,10 +148,9 @@ class CollaborativeReleaseNotesDB:
                 is_active BOOLEAN DEFAULT TRUE,
                 final_markdown TEXT
             )
-        ''')
-        
+        ''',
         # Tabela para tasks individuais
-        cursor.execute('''
+        '''
             CREATE TABLE IF NOT EXISTS tasks (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 version_id INTEGER,
@@ -59,14 +165,190 @@ class CollaborativeReleaseNotesDB:
                 FOREIGN KEY (version_id) REFERENCES release_versions (id),
                 UNIQUE(version_id, jira_task_id)
             )
-        ''')
+        ''',
+    ),
+    # v2: final_markdown passa a ser o cache do markdown compilado; descarta valores antigos
+    (
+        "UPDATE release_versions SET final_markdown = NULL",
+    ),
+    # v3: posição da seção gravada na task (type_rank) e índices para as consultas frequentes
+    (
+        "ALTER TABLE tasks ADD COLUMN type_rank INTEGER NOT NULL DEFAULT 5",
+        '''
+            UPDATE tasks SET type_rank = CASE task_type
+                WHEN 'User Story' THEN 1
+                WHEN 'Bug' THEN 2
+                WHEN 'Improvement' THEN 3
+                WHEN 'Technical Debt' THEN 4
+                ELSE 5
+            END
+        ''',
+        # Montagem do markdown: tasks da versão já na ordem das seções (id é a chave final implícita)
+        "CREATE INDEX IF NOT EXISTS idx_tasks_version_rank ON tasks (version_id, type_rank, created_at)",
+        # Estatísticas por tipo e contagens por versão (índice cobre a consulta)
+        "CREATE INDEX IF NOT EXISTS idx_tasks_version_type ON tasks (version_id, task_type)",
+        # Listagens de versões ordenadas por data de criação
+        "CREATE INDEX IF NOT EXISTS idx_release_versions_created_at ON release_versions (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_release_versions_active ON release_versions (is_active)",
+    ),
+    # v4: busca textual (FTS5) em título, descrição e conteúdo gerado das tasks
+    _create_search_index,
+    # v5: assinaturas MinHash/LSH para apontar tasks quase duplicadas
+    _create_near_duplicate_index,
+    # v6: LSH com 32 faixas de 2 linhas (antes 16 x 4), para encontrar os pares no limiar de similaridade
+    _rebuild_lsh_bands,
+]
+
+# Consultas frequentes (verificadas por benchmarks/check_query_plans.py)
+LOAD_DOCUMENT_SQL = '''
+    SELECT task_type, jira_task_id, generated_content
+    FROM tasks
+    WHERE version_id = ?
+    ORDER BY type_rank, created_at ASC, id ASC
+'''
+
+# Total e contagem por tipo; em um LEFT JOIN sem tasks, SUM devolve NULL
+STATS_COLUMNS = '''
+    COUNT(t.id),
+    COALESCE(SUM(t.task_type = 'User Story'), 0),
+    COALESCE(SUM(t.task_type = 'Bug'), 0),
+    COALESCE(SUM(t.task_type = 'Improvement'), 0),
+    COALESCE(SUM(t.task_type = 'Technical Debt'), 0)
+'''
+
+# Sem GROUP BY: sempre retorna uma linha (v.id NULL quando a versão não existe)
+VERSION_STATS_BY_NAME_SQL = f'''
+    SELECT v.id, {STATS_COLUMNS}
+    FROM release_versions v
+    LEFT JOIN tasks t ON t.version_id = v.id
+    WHERE v.version_name = ?
+'''
+
+# GROUP BY na ordem do índice de created_at (rowid incluso), sem B-tree temporária
+ALL_VERSION_STATS_SQL = f'''
+    SELECT v.version_name, {STATS_COLUMNS}
+    FROM release_versions v
+    LEFT JOIN tasks t ON t.version_id = v.id
+    GROUP BY v.created_at, v.id
+    ORDER BY v.created_at DESC, v.id DESC
+'''
+
+# Exportação em streaming: primeira edição manual (substitui o documento inteiro),
+# existência de tasks e as tasks das seções conhecidas já na ordem do documento
+FIRST_MANUAL_EDIT_SQL = '''
+    SELECT generated_content
+    FROM tasks
+    WHERE version_id = ? AND type_rank = ? AND task_type = ?
+    ORDER BY type_rank, created_at ASC, id ASC
+    LIMIT 1
+'''
+
+HAS_TASKS_SQL = "SELECT EXISTS (SELECT 1 FROM tasks WHERE version_id = ?)"
+
+STREAM_SECTIONS_SQL = '''
+    SELECT task_type, generated_content
+    FROM tasks
+    WHERE version_id = ? AND type_rank <= ?
+    ORDER BY type_rank, created_at ASC, id ASC
+'''
+
+# Busca: bm25 com pesos por coluna (ID e título valem mais que o texto), trecho do melhor campo
+SEARCH_SQL = f'''
+    SELECT v.version_name, t.jira_task_id, t.task_type,
+           highlight(tasks_fts, 1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}'),
+           snippet(tasks_fts, -1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 24),
+           bm25(tasks_fts, 10.0, 5.0, 1.0, 1.0) AS score
+    FROM tasks_fts
+    JOIN tasks t ON t.id = tasks_fts.rowid
+    JOIN release_versions v ON v.id = t.version_id
+    WHERE tasks_fts MATCH ?
+    ORDER BY score
+    LIMIT ?
+'''
+
+# Tasks que compartilham ao menos um balde LSH com a assinatura consultada
+NEAR_DUPLICATE_CANDIDATES_SQL = f'''
+    SELECT s.signature, v.version_name, t.jira_task_id, t.task_type, t.task_title
+    FROM task_signatures s
+    JOIN tasks t ON t.id = s.task_id
+    JOIN release_versions v ON v.id = t.version_id
+    WHERE s.task_id IN (SELECT task_id FROM task_lsh_bands WHERE band_key IN ({", ".join("?" * LSH_BANDS)}))
+'''
+
+TASK_IDS_SQL = '''
+    SELECT t.jira_task_id
+    FROM release_versions v
+    JOIN tasks t ON t.version_id = v.id
+    WHERE v.version_name = ?
+'''
+
+# Sem FTS5: busca simples por substring, mais recentes primeiro
+SEARCH_LIKE_SQL = '''
+    SELECT v.version_name, t.jira_task_id, t.task_type, t.task_title, substr(t.generated_content, 1, 200), 0.0
+    FROM tasks t
+    JOIN release_versions v ON v.id = t.version_id
+    WHERE t.jira_task_id LIKE ?1 OR t.task_title LIKE ?1 OR t.task_description LIKE ?1 OR t.generated_content LIKE ?1
+    ORDER BY t.created_at DESC
+    LIMIT ?2
+'''
+
+ACTIVE_VERSION_SQL = "SELECT id, version_name FROM release_versions WHERE is_active = TRUE LIMIT 1"
+
+# Subconsultas correlacionadas: percorre as versões já na ordem do índice de created_at,
+# sem GROUP BY sobre o JOIN (que exigiria uma B-tree temporária para ordenar)
+LIST_VERSIONS_SQL = '''
+    SELECT v.id, v.version_name, v.created_at, v.is_active,
+           (SELECT COUNT(*) FROM tasks t WHERE t.version_id = v.id) AS task_count
+    FROM release_versions v
+    ORDER BY v.created_at DESC
+'''
+
+ALL_VERSIONS_SQL = '''
+    SELECT id, version_name, created_at, is_active
+    FROM release_versions
+    ORDER BY created_at DESC
+'''
+
+VERSIONS_SUMMARY_SQL = '''
+    SELECT v.version_name, v.created_at,
+           (SELECT COUNT(*) FROM tasks t WHERE t.version_id = v.id),
+           (SELECT GROUP_CONCAT(t.id || ':' || LENGTH(t.generated_content)) FROM tasks t WHERE t.version_id = v.id)
+    FROM release_versions v
+    ORDER BY v.created_at DESC
+'''
+
+class CollaborativeReleaseNotesDB:
+    def __init__(self, db_path="collaborative_release_notes.db"):
+        self.db_path = db_path
+        # Documentos por seção das versões recentes (version_id -> ReleaseNotesDocument)
+        self._documents = OrderedDict()
+        self.init_database()
+    
+    @profiled()
+    def clear_database(self):
+        """Limpa todos os dados do banco de dados (os contadores AUTOINCREMENT são mantidos: ids não são reutilizados)"""
+        conn = connect(self.db_path)
+        cursor = conn.cursor()
+        
+        # Deletar todas as tasks primeiro (devido à foreign key)
+        cursor.execute("DELETE FROM tasks")
+        
+        # Deletar todas as versões
+        cursor.execute("DELETE FROM release_versions")
         
         conn.commit()
         conn.close()
+        self._documents.clear()
+        print("Banco de dados limpo com sucesso!")
+
+    def init_database(self):
+        """Inicializa o banco de dados colaborativo (DDL roda uma vez por processo)"""
+        apply_migrations(self.db_path, MIGRATIONS)
     
+    @profiled()
     def get_version_if_exists(self, version_name):
         """Pega uma versão específica apenas se ela existir, sem criar"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         # Buscar versão específica
@@ -80,9 +362,20 @@ class CollaborativeReleaseNotesDB:
         else:
             return None, None
 
+    @profiled(rows=len)
+    def get_task_ids(self, version_name):
+        """IDs (jira_task_id) das tasks já gravadas na versão; vazio se ela não existe"""
+        conn = connect(self.db_path)
+        try:
+            rows = conn.execute(TASK_IDS_SQL, (version_name,)).fetchall()
+        finally:
+            conn.close()
+        return {row[0] for row in rows}
+    
+    @profiled()
     def get_or_create_version(self, version_name):
         """Pega uma versão específica ou cria uma nova"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         # Buscar versão específica
@@ -102,13 +395,14 @@ class CollaborativeReleaseNotesDB:
         
         return version_id, version_name
     
+    @profiled()
     def get_or_create_active_version(self):
         """Pega a versão ativa ou cria uma nova (método antigo mantido para compatibilidade)"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         # Buscar versão ativa
-        cursor.execute("SELECT id, version_name FROM release_versions WHERE is_active = TRUE LIMIT 1")
+        cursor.execute(ACTIVE_VERSION_SQL)
         result = cursor.fetchone()
         
         if result:
@@ -125,6 +419,7 @@ class CollaborativeReleaseNotesDB:
         
         return version_id, version_name
     
+    @profiled()
     def add_task(self, task_data, generated_content, version_name=None):
         """Adiciona uma nova task à versão especificada"""
         if version_name:
@@ -132,15 +427,15 @@ class CollaborativeReleaseNotesDB:
         else:
             version_id, version_name = self.get_or_create_active_version()
         
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         try:
             cursor.execute('''
                 INSERT OR REPLACE INTO tasks 
                 (version_id, jira_task_id, task_type, task_title, task_description, 
-                 generated_content, evidence_image)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+                 generated_content, evidence_image, type_rank)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 version_id,
                 task_data['jira_task_id'],
@@ -148,153 +443,387 @@ class CollaborativeReleaseNotesDB:
                 task_data['jira_task_title'],
                 task_data['jira_task_description'],
                 generated_content,
-                task_data.get('evidence_image', '')
+                task_data.get('evidence_image', ''),
+                section_rank(task_data['tipo_task'])
             ))
+            _store_signatures(cursor, [(
+                cursor.lastrowid,
+                task_data['tipo_task'],
+                task_data['jira_task_title'],
+                task_data['jira_task_description']
+            )])
+            
+            self._splice_tasks(cursor, version_id, [(task_data['tipo_task'], task_data['jira_task_id'], generated_content)])
             
             conn.commit()
             return True
             
         except Exception as e:
-            st.error(f"Erro ao adicionar task: {str(e)}")
+            self._documents.pop(version_id, None)
+            report_error(f"Erro ao adicionar task: {str(e)}")
             return False
         finally:
             conn.close()
     
-    def generate_collaborative_markdown(self, version_name=None):
-        """Gera o markdown colaborativo para uma versão específica"""
-        if version_name:
-            version_id, version_name_found = self.get_version_if_exists(version_name)
-            if not version_id:
-                # Se a versão não existe, retorna mensagem padrão sem criar
-                return "Nenhuma task adicionada ainda para esta versão."
+    @profiled(rows=lambda report: report['inserted'] + len(report['replaced']))
+    def add_tasks(self, version_name, tasks):
+        """Adiciona várias tasks a uma versão em uma única transação.
+
+        Cada item de `tasks` é um dict com os campos de task_data mais
+        'generated_content'. Retorna um relatório com as tasks inseridas, as que
+        substituíram tasks já existentes na versão, os IDs repetidos no próprio
+        lote (vale a última ocorrência) e as linhas inválidas (campos ausentes
+        ou tipo de task fora de SECTION_ORDER e TASK_TYPE_ALIASES).
+        """
+        report = {'inserted': 0, 'replaced': [], 'duplicates': [], 'errors': []}
+        rows = []
+        seen_ids = set()
+        
+        for index, task in enumerate(tasks):
+            missing = [field for field in TASK_REQUIRED_FIELDS if not task.get(field)]
+            if missing:
+                report['errors'].append({'row': index, 'error': f"Campos obrigatórios ausentes: {', '.join(missing)}"})
+                continue
+            # Tipos fora das seções não aparecem no markdown: recusa em vez de gravar a task invisível
+            task_type = canonical_task_type(task['tipo_task'])
+            if task_type is None:
+                report['errors'].append({
+                    'row': index,
+                    'error': f"Tipo de task desconhecido: {task['tipo_task']} (aceitos: {', '.join(SECTION_ORDER)})"
+                })
+                continue
+            if task_type != task['tipo_task']:
+                task = dict(task, tipo_task=task_type)
+            if task['jira_task_id'] in seen_ids:
+                report['duplicates'].append(task['jira_task_id'])
+            seen_ids.add(task['jira_task_id'])
+            rows.append(task)
+        
+        if not rows:
+            return report
+        
+        conn = connect(self.db_path)
+        cursor = conn.cursor()
+        version_id = None
+        
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            
+            # Resolver (ou criar) a versão uma única vez
+            cursor.execute("SELECT id FROM release_versions WHERE version_name = ?", (version_name,))
+            result = cursor.fetchone()
+            if result:
+                version_id = result[0]
+            else:
+                cursor.execute("INSERT INTO release_versions (version_name, is_active) VALUES (?, FALSE)", (version_name,))
+                version_id = cursor.lastrowid
+            
+            cursor.execute("SELECT jira_task_id FROM tasks WHERE version_id = ?", (version_id,))
+            existing_ids = {row[0] for row in cursor.fetchall()}
+            report['replaced'] = sorted(seen_ids & existing_ids)
+            report['inserted'] = len(seen_ids - existing_ids)
+            
+            # Ids são AUTOINCREMENT: as linhas gravadas por este lote são as de id maior que o atual
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM tasks")
+            last_id = cursor.fetchone()[0]
+            
+            cursor.executemany('''
+                INSERT OR REPLACE INTO tasks 
+                (version_id, jira_task_id, task_type, task_title, task_description, 
+                 generated_content, evidence_image, type_rank)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                (
+                    version_id,
+                    task['jira_task_id'],
+                    task['tipo_task'],
+                    task['jira_task_title'],
+                    task['jira_task_description'],
+                    task['generated_content'],
+                    task.get('evidence_image', ''),
+                    section_rank(task['tipo_task'])
+                )
+                for task in rows
+            ])
+            cursor.execute(f"{SIGNATURE_SOURCE_SQL} WHERE id > ?", (last_id,))
+            _store_signatures(cursor, cursor.fetchall())
+            
+            self._splice_tasks(cursor, version_id, [
+                (task['tipo_task'], task['jira_task_id'], task['generated_content'])
+                for task in rows
+            ])
+            
+            conn.commit()
+            return report
+            
+        except Exception as e:
+            conn.rollback()
+            self._documents.pop(version_id, None)
+            raise Exception(f"Erro ao importar tasks: {str(e)}")
+        finally:
+            conn.close()
+    
+    def _splice_tasks(self, cursor, version_id, tasks):
+        """Atualiza o markdown materializado da versão só com os fragmentos das tasks.
+
+        `tasks` é uma lista de (task_type, jira_task_id, generated_content). Deve rodar
+        dentro da transação que gravou as tasks. Se o documento em memória não
+        corresponde ao cache do banco (ex.: outro processo escreveu), o cache é
+        invalidado e será remontado na próxima leitura.
+        """
+        document = self._documents.get(version_id)
+        cursor.execute("SELECT final_markdown FROM release_versions WHERE id = ?", (version_id,))
+        final_markdown = cursor.fetchone()[0]
+        
+        if document is not None and final_markdown is not None and document.render() == final_markdown:
+            for task_type, jira_task_id, generated_content in tasks:
+                document.set_task(task_type, jira_task_id, generated_content)
+            markdown = document.render()
         else:
-            version_id, _ = self.get_or_create_active_version()
+            self._documents.pop(version_id, None)
+            markdown = None
+        
+        cursor.execute("UPDATE release_versions SET final_markdown = ? WHERE id = ?", (markdown, version_id))
+    
+    @profiled()
+    def generate_collaborative_markdown(self, version_name=None):
+        """Gera o markdown colaborativo para uma versão específica.
+
+        O resultado fica materializado em release_versions.final_markdown; enquanto
+        a versão não muda, a leitura custa uma única consulta pela chave.
+        """
+        if not version_name:
+            _, version_name = self.get_or_create_active_version()
         
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
+        try:
+            cursor.execute("SELECT id, final_markdown FROM release_versions WHERE version_name = ?", (version_name,))
+            result = cursor.fetchone()
+            
+            if not result:
+                # Se a versão não existe, retorna mensagem padrão sem criar
+                return "Nenhuma task adicionada ainda para esta versão."
+            
+            version_id, final_markdown = result
+            if final_markdown is not None:
+                return final_markdown
+            
+            # Cache vazio: montar e gravar na mesma transação de escrita, para que
+            # uma task adicionada em paralelo não deixe um markdown desatualizado no cache
+            cursor.execute("BEGIN IMMEDIATE")
+            markdown = self._load_document(cursor, version_id).render()
+            cursor.execute("UPDATE release_versions SET final_markdown = ? WHERE id = ?", (markdown, version_id))
+            conn.commit()
+            
+            return markdown
+        finally:
+            conn.close()
+    
+    @profiled(rows=len)
+    def _load_document(self, cursor, version_id):
+        """Carrega as tasks de uma versão no modelo de documento por seção"""
         # Buscar todas as tasks da versão
-        cursor.execute('''
-            SELECT task_type, jira_task_id, task_title, generated_content, evidence_image, developer_name
-            FROM tasks 
-            WHERE version_id = ?
-            ORDER BY 
-                CASE task_type 
-                    WHEN 'User Story' THEN 1
-                    WHEN 'Bug' THEN 2
-                    WHEN 'Improvement' THEN 3
-                    WHEN 'Technical Debt' THEN 4
-                    ELSE 5
-                END,
-                created_at ASC
-        ''', (version_id,))
-        
-        tasks = cursor.fetchall()
-        conn.close()
+        cursor.execute(LOAD_DOCUMENT_SQL, (version_id,))
         
-        if not tasks:
-            return "[[_TOC_]]\n\n---\n\n*Nenhuma task adicionada ainda*"
-        
-        # Verificar se há conteúdo editado manualmente
-        manual_edit_task = [t for t in tasks if t[0] == 'MANUAL_EDIT']
-        if manual_edit_task:
-            # Se há conteúdo editado manualmente, retornar diretamente
-            return manual_edit_task[0][3]  # generated_content
-        
-        # Caso contrário, montar markdown colaborativo das tasks normais
-        markdown = "[[_TOC_]]\n\n---\n\n"
-        
-        # Separar por tipo usando os novos tipos
-        user_stories = [t for t in tasks if t[0] == 'User Story']
-        bugs = [t for t in tasks if t[0] == 'Bug']
-        improvements = [t for t in tasks if t[0] == 'Improvement']
-        technical_debts = [t for t in tasks if t[0] == 'Technical Debt']
-        
-        # Adicionar seções na ordem especificada
-        if user_stories:
-            markdown += "##User Story\n"
-            for task in user_stories:
-                markdown += f"{task[3]}\n\n"
-        
-        if bugs:
-            markdown += "##Bug\n"
-            for task in bugs:
-                markdown += f"{task[3]}\n\n"
-        
-        if improvements:
-            markdown += "##Improvement\n"
-            for task in improvements:
-                markdown += f"{task[3]}\n\n"
-        
-        if technical_debts:
-            markdown += "##Technical Debt\n"
-            for task in technical_debts:
-                markdown += f"{task[3]}\n\n"
-        
-        return markdown.rstrip() + "\n"
+        document = ReleaseNotesDocument.from_rows(cursor.fetchall())
+        self._remember_document(version_id, document)
+        return document
     
-    def get_version_stats(self, version_name=None):
-        """Retorna estatísticas de uma versão específica"""
-        if version_name:
-            version_id, _ = self.get_version_if_exists(version_name)
-            if not version_id:
-                # Se a versão não existe, retorna stats vazias
-                return {
-                    'total': 0,
-                    'user_stories': 0,
-                    'bugs': 0,
-                    'improvements': 0,
-                    'technical_debts': 0
-                }
-        else:
-            version_id, _ = self.get_or_create_active_version()
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def _remember_document(self, version_id, document):
+        """Mantém em memória os documentos das versões usadas mais recentemente"""
+        self._documents.pop(version_id, None)
+        self._documents[version_id] = document
+        while len(self._documents) > MAX_CACHED_DOCUMENTS:
+            self._documents.popitem(last=False)
+    
+    def iter_collaborative_markdown(self, version_name, chunk_size=EXPORT_CHUNK_SIZE):
+        """Produz o markdown da versão em pedaços de até ~chunk_size caracteres, com memória limitada.
+
+        O texto é idêntico ao de generate_collaborative_markdown, mas as tasks
+        são lidas do cursor uma a uma, sem montar o documento inteiro. O cache
+        (final_markdown) não é usado nem preenchido: lê-lo traria o documento
+        inteiro para a memória de uma vez.
+        """
+        conn = connect(self.db_path)
+        try:
+            # Uma única transação de leitura: todas as consultas veem o mesmo estado da versão
+            conn.execute("BEGIN")
+            result = conn.execute("SELECT id FROM release_versions WHERE version_name = ?", (version_name,)).fetchone()
+            if not result:
+                yield "Nenhuma task adicionada ainda para esta versão."
+                return
+            
+            version_id = result[0]
+            
+            # Conteúdo editado manualmente substitui o documento inteiro
+            manual_edit = conn.execute(FIRST_MANUAL_EDIT_SQL, (version_id, OTHER_SECTION_RANK, MANUAL_EDIT_TYPE)).fetchone()
+            if manual_edit:
+                yield manual_edit[0]
+                return
+            
+            if not conn.execute(HAS_TASKS_SQL, (version_id,)).fetchone()[0]:
+                yield EMPTY_MARKDOWN
+                return
+            
+            yield from self._stream_sections(conn.execute(STREAM_SECTIONS_SQL, (version_id, len(SECTION_ORDER))), chunk_size)
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _stream_sections(rows, chunk_size):
+        """Monta o documento a partir de (task_type, generated_content) ordenados, como ReleaseNotesDocument.render.
+
+        O render aplica rstrip() ao texto inteiro; aqui o espaço em branco do fim
+        de cada pedaço fica pendente e só é emitido se vier mais conteúdo depois.
+        """
+        parts = [MARKDOWN_HEADER]
+        size = len(MARKDOWN_HEADER)
+        pending_whitespace = ""
+        current_type = None
+        
+        for task_type, generated_content in rows:
+            if task_type != current_type:
+                current_type = task_type
+                parts.append(f"##{task_type}\n")
+            parts.append(f"{generated_content}\n\n")
+            size += len(parts[-1])
+            
+            if size >= chunk_size:
+                chunk = pending_whitespace + "".join(parts)
+                body = chunk.rstrip()
+                pending_whitespace = chunk[len(body):]
+                if body:
+                    yield body
+                parts = []
+                size = 0
+        
+        body = (pending_whitespace + "".join(parts)).rstrip()
+        yield body + "\n"
+    
+    @profiled(rows=len)
+    def find_near_duplicates(self, task_data, version_name=None, threshold=NEAR_DUPLICATE_THRESHOLD):
+        """Tasks já gravadas (em qualquer versão) com título e descrição quase iguais aos da task.
+
+        A própria task (mesmo ID na mesma versão, que seria substituída) não
+        entra. Retorna dicts com version_name, jira_task_id, task_type,
+        task_title e similarity (Jaccard estimado), da mais parecida para a menos.
+        """
+        signature = minhash_signature(f"{task_data.get('jira_task_title', '')}\n{task_data.get('jira_task_description', '')}")
+        if signature is None:
+            return []
+        
+        conn = connect(self.db_path)
+        try:
+            rows = conn.execute(NEAR_DUPLICATE_CANDIDATES_SQL, band_keys(signature)).fetchall()
+        finally:
+            conn.close()
         
-        cursor.execute('''
-            SELECT task_type, COUNT(*) 
-            FROM tasks 
-            WHERE version_id = ? 
-            GROUP BY task_type
-        ''', (version_id,))
+        duplicates = []
+        for blob, candidate_version, jira_task_id, task_type, task_title in rows:
+            if candidate_version == version_name and jira_task_id == task_data.get('jira_task_id'):
+                continue
+            similarity = estimated_similarity(signature, signature_from_blob(blob))
+            if similarity >= threshold:
+                duplicates.append({
+                    'version_name': candidate_version,
+                    'jira_task_id': jira_task_id,
+                    'task_type': task_type,
+                    'task_title': task_title,
+                    'similarity': similarity
+                })
+        
+        duplicates.sort(key=lambda duplicate: duplicate['similarity'], reverse=True)
+        return duplicates
+    
+    @profiled()
+    def search_tasks(self, query, limit=20):
+        """Busca textual nas tasks de todas as versões, das mais relevantes para as menos.
+
+        Retorna dicts com version_name, jira_task_id, task_type, title e snippet;
+        os termos encontrados vêm entre HIGHLIGHT_START e HIGHLIGHT_END.
+        """
+        terms = query.split()
+        if not terms:
+            return []
+        
+        conn = connect(self.db_path)
+        try:
+            has_index = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'tasks_fts'").fetchone()
+            if has_index:
+                rows = conn.execute(SEARCH_SQL, (build_search_query(terms), limit)).fetchall()
+            else:
+                rows = conn.execute(SEARCH_LIKE_SQL, (f"%{query.strip()}%", limit)).fetchall()
+        finally:
+            conn.close()
         
-        stats = dict(cursor.fetchall())
+        return [
+            {
+                'version_name': version_name,
+                'jira_task_id': jira_task_id,
+                'task_type': task_type,
+                'title': title,
+                'snippet': snippet,
+                'score': score
+            }
+            for version_name, jira_task_id, task_type, title, snippet, score in rows
+        ]
+    
+    @profiled()
+    def get_version_stats(self, version_name=None):
+        """Retorna estatísticas de uma versão específica (total e quantidade por tipo) em uma consulta"""
+        if not version_name:
+            _, version_name = self.get_or_create_active_version()
         
-        cursor.execute('SELECT COUNT(*) FROM tasks WHERE version_id = ?', (version_id,))
-        total = cursor.fetchone()[0]
+        conn = connect(self.db_path)
+        try:
+            row = conn.execute(VERSION_STATS_BY_NAME_SQL, (version_name,)).fetchone()
+        finally:
+            conn.close()
         
-        conn.close()
+        # Se a versão não existe, retorna stats vazias
+        return self._stats_from_row(row[1:])
+    
+    @profiled(rows=len)
+    def get_all_version_stats(self):
+        """Estatísticas de todas as versões de uma vez: {version_name: stats}, da mais recente para a mais antiga"""
+        conn = connect(self.db_path)
+        try:
+            rows = conn.execute(ALL_VERSION_STATS_SQL).fetchall()
+        finally:
+            conn.close()
         
+        return {row[0]: self._stats_from_row(row[1:]) for row in rows}
+    
+    @staticmethod
+    def _stats_from_row(counts):
+        total, user_stories, bugs, improvements, technical_debts = counts
         return {
             'total': total,
-            'user_stories': stats.get('User Story', 0),
-            'bugs': stats.get('Bug', 0),
-            'improvements': stats.get('Improvement', 0),
-            'technical_debts': stats.get('Technical Debt', 0)
+            'user_stories': user_stories,
+            'bugs': bugs,
+            'improvements': improvements,
+            'technical_debts': technical_debts
         }
     
+    @profiled()
     def list_all_versions(self):
         """Lista todas as versões"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT v.id, v.version_name, v.created_at, v.is_active, COUNT(t.id) as task_count
-            FROM release_versions v
-            LEFT JOIN tasks t ON v.id = t.version_id
-            GROUP BY v.id, v.version_name, v.created_at, v.is_active
-            ORDER BY v.created_at DESC
-        ''')
+        cursor.execute(LIST_VERSIONS_SQL)
         
         versions = cursor.fetchall()
         conn.close()
         
         return versions
     
+    @profiled()
     def create_new_version(self, version_name):
         """Cria uma nova versão e desativa a atual"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         # Desativar versão atual
@@ -308,25 +837,49 @@ class CollaborativeReleaseNotesDB:
         
         return True
     
+    @profiled()
     def get_all_versions(self):
         """Retorna todas as versões existentes ordenadas por data de criação"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
 
-        cursor.execute("""
-            SELECT id, version_name, created_at, is_active 
-            FROM release_versions 
-            ORDER BY created_at DESC
-        """)
+        cursor.execute(ALL_VERSIONS_SQL)
 
         versions = cursor.fetchall()
         conn.close()
 
         return versions
     
+    @profiled()
+    def get_versions_summary(self):
+        """Resumo das versões para o painel lateral em uma única consulta agregada.
+
+        Retorna nome, data de criação, quantidade de tasks e um hash do conteúdo
+        (muda sempre que uma task é adicionada, substituída ou removida), sem
+        carregar o conteúdo gerado das tasks.
+        """
+        conn = connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute(VERSIONS_SUMMARY_SQL)
+
+        rows = cursor.fetchall()
+        conn.close()
+
+        return [
+            {
+                'version_name': version_name,
+                'created_at': created_at,
+                'task_count': task_count,
+                'content_hash': hashlib.sha1((signature or '').encode()).hexdigest()[:12]
+            }
+            for version_name, created_at, task_count, signature in rows
+        ]
+    
+    @profiled()
     def update_version_content(self, version_name, new_content):
         """Atualiza o conteúdo de uma versão específica"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         try:
@@ -341,12 +894,13 @@ class CollaborativeReleaseNotesDB:
             
             # Limpar todas as tasks da versão
             cursor.execute("DELETE FROM tasks WHERE version_id = ?", (version_id,))
+            self._documents.pop(version_id, None)
             
             # Inserir o conteúdo editado como uma task especial que será reconhecida
             cursor.execute("""
                 INSERT INTO tasks 
-                (version_id, jira_task_id, task_type, task_title, task_description, generated_content, evidence_image)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+                (version_id, jira_task_id, task_type, task_title, task_description, generated_content, evidence_image, type_rank)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 version_id,
                 'MANUAL_EDIT',
@@ -354,9 +908,13 @@ class CollaborativeReleaseNotesDB:
                 'Conteúdo Editado Manualmente',
                 'Conteúdo completo editado pelo usuário',
                 new_content,
-                None
+                None,
+                section_rank('MANUAL_EDIT')
             ))
             
+            # O conteúdo editado manualmente é o próprio markdown da versão
+            cursor.execute("UPDATE release_versions SET final_markdown = ? WHERE id = ?", (new_content, version_id))
+            
             conn.commit()
             return True
             
@@ -366,9 +924,10 @@ class CollaborativeReleaseNotesDB:
         finally:
             conn.close()
     
+    @profiled()
     def delete_version(self, version_name):
         """Exclui uma versão e todas as suas tasks"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         try:
@@ -386,6 +945,7 @@ class CollaborativeReleaseNotesDB:
             
             # Excluir a versão
             cursor.execute("DELETE FROM release_versions WHERE id = ?", (version_id,))
+            self._documents.pop(version_id, None)
             
             conn.commit()
             return True
@@ -396,6 +956,19 @@ class CollaborativeReleaseNotesDB:
         finally:
             conn.close()
 
-def get_collaborative_db():
-    """Função helper para usar no Streamlit"""
-    return CollaborativeReleaseNotesDB()
\ No newline at end of file
+def build_search_query(terms):
+    """Monta a consulta FTS5: cada termo entre aspas (sem operadores), todos obrigatórios, o último como prefixo"""
+    quoted = ['"' + term.replace('"', '""') + '"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+# Instâncias compartilhadas pelo processo, uma por arquivo de banco
+_db_instances = {}
+
+def get_collaborative_db(db_path="collaborative_release_notes.db"):
+    """Função helper para usar no Streamlit (reaproveita a mesma instância entre reruns)"""
+    db = _db_instances.get(db_path)
+    if db is None:
+        db = _db_instances.setdefault(db_path, CollaborativeReleaseNotesDB(db_path))
+    return db
\ No newline at end of file
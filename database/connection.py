@@ -0,0 +1,112 @@
+import sqlite3
+import threading
+from collections import defaultdict
+
+# Pragmas aplicados uma única vez a cada conexão nova do pool
+DEFAULT_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+    # INSERT OR REPLACE só dispara os triggers de DELETE (ex.: índice de busca) com esta opção
+    "PRAGMA recursive_triggers=ON",
+)
+
+# Quantidade máxima de conexões ociosas mantidas por banco
+MAX_IDLE_CONNECTIONS = 8
+
+
+class PooledConnection(sqlite3.Connection):
+    """Conexão SQLite cujo close() devolve a conexão ao pool em vez de fechá-la"""
+
+    def __init__(self, database, *args, **kwargs):
+        super().__init__(database, *args, **kwargs)
+        self._db_path = database
+        self._pooled = False
+        self._pool = None
+
+    def close(self):
+        if not self._pooled:
+            super().close()
+        elif self._pool is not None:
+            self._pool.release(self)
+        # Conexão já devolvida ao pool: close() repetido não faz nada
+
+    def really_close(self):
+        """Fecha de fato a conexão, ignorando o pool"""
+        self._pooled = False
+        self._pool = None
+        super().close()
+
+
+class ConnectionPool:
+    """Pool de conexões SQLite compartilhado pelo processo inteiro (thread-safe)"""
+
+    def __init__(self, max_idle=MAX_IDLE_CONNECTIONS, pragmas=DEFAULT_PRAGMAS):
+        self.max_idle = max_idle
+        self.pragmas = pragmas
+        self._idle = defaultdict(list)
+        self._lock = threading.Lock()
+        self._stats = {'opened': 0, 'reused': 0}
+
+    def acquire(self, db_path):
+        """Empresta uma conexão ociosa do pool ou abre uma nova"""
+        with self._lock:
+            idle = self._idle[db_path]
+            if idle:
+                self._stats['reused'] += 1
+                conn = idle.pop()
+                conn._pool = self
+                return conn
+            self._stats['opened'] += 1
+
+        conn = sqlite3.connect(db_path, factory=PooledConnection, check_same_thread=False)
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        conn._pooled = True
+        conn._pool = self
+        return conn
+
+    def release(self, conn):
+        """Devolve a conexão ao pool, desfazendo transações pendentes"""
+        if conn.in_transaction:
+            conn.rollback()
+        conn._pool = None
+        with self._lock:
+            idle = self._idle[conn._db_path]
+            if len(idle) < self.max_idle:
+                idle.append(conn)
+                return
+        conn.really_close()
+
+    def close_all(self):
+        """Fecha todas as conexões ociosas do pool"""
+        with self._lock:
+            connections = [conn for idle in self._idle.values() for conn in idle]
+            self._idle.clear()
+        for conn in connections:
+            conn.really_close()
+
+    def get_stats(self):
+        """Retorna quantas conexões foram abertas e reutilizadas desde o último reset"""
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        """Zera os contadores (chamado a cada rerun do Streamlit)"""
+        with self._lock:
+            self._stats = {'opened': 0, 'reused': 0}
+
+
+_pool = ConnectionPool()
+
+
+def connect(db_path):
+    """Empresta uma conexão do pool global; conn.close() a devolve ao pool"""
+    return _pool.acquire(db_path)
+
+
+def get_pool():
+    """Retorna o pool global de conexões"""
+    return _pool
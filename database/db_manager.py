@@ -1,21 +1,37 @@
 import sqlite3
 import json
+import functools
+from collections import namedtuple
 from datetime import datetime
 from pathlib import Path
-import streamlit as st
+from database.reporting import report_error
+from database.connection import connect
+from database.migrations import apply_migrations
+from database.blob_store import BlobRef, BlobStore, blob_dir_for
 
-class ReleaseNotesDB:
-    def __init__(self, db_path="release_notes.db"):
-        self.db_path = db_path
-        self.init_database()
-    
-    def init_database(self):
-        """Inicializa o banco de dados com as tabelas necessárias"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+
+def _move_images_to_blob_store(conn):
+    """Move as imagens gravadas em evidence_image_data para o BlobStore do banco"""
+    conn.execute("ALTER TABLE release_entries ADD COLUMN evidence_image_hash TEXT")
+
+    db_file = next(row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main")
+    store = BlobStore(blob_dir_for(db_file))
+
+    # Uma linha por vez: não carrega todas as imagens na memória
+    ids = [row[0] for row in conn.execute("SELECT id FROM release_entries WHERE evidence_image_data IS NOT NULL")]
+    for entry_id in ids:
+        data = conn.execute("SELECT evidence_image_data FROM release_entries WHERE id = ?", (entry_id,)).fetchone()[0]
+        conn.execute(
+            "UPDATE release_entries SET evidence_image_hash = ?, evidence_image_data = NULL WHERE id = ?",
+            (store.put(bytes(data)), entry_id)
+        )
+
+# Migrações do schema, na ordem; o índice + 1 corresponde ao PRAGMA user_version
+MIGRATIONS = [
+    # v1: schema inicial
+    (
         # Tabela para armazenar entries de release notes
-        cursor.execute('''
+        '''
             CREATE TABLE IF NOT EXISTS release_entries (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 jira_task_id TEXT NOT NULL,
@@ -31,10 +47,9 @@ class ReleaseNotesDB:
                 sprint_version TEXT,
                 status TEXT DEFAULT 'draft'
             )
-        ''')
-        
+        ''',
         # Tabela para gerenciar sprints/versões
-        cursor.execute('''
+        '''
             CREATE TABLE IF NOT EXISTS sprints (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 sprint_name TEXT UNIQUE NOT NULL,
@@ -43,10 +58,9 @@ class ReleaseNotesDB:
                 status TEXT DEFAULT 'active',
                 description TEXT
             )
-        ''')
-        
+        ''',
         # Tabela para documentos RAG (PDFs de exemplo)
-        cursor.execute('''
+        '''
             CREATE TABLE IF NOT EXISTS rag_documents (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 filename TEXT NOT NULL,
@@ -55,21 +69,132 @@ class ReleaseNotesDB:
                 file_size INTEGER,
                 processed BOOLEAN DEFAULT FALSE
             )
-        ''')
+        ''',
+    ),
+    # v2: imagens de evidência saem do banco para o BlobStore (só o hash fica na linha)
+    _move_images_to_blob_store,
+]
+
+# Campos de uma entry, na ordem padrão; evidence_image_data é o BlobRef de evidence_image_hash
+ENTRY_FIELDS = (
+    'id', 'jira_task_id', 'task_title', 'task_type', 'task_description', 'generated_content',
+    'evidence_image_name', 'evidence_image_hash', 'evidence_image_data', 'developer_name',
+    'created_at', 'updated_at', 'sprint_version', 'status'
+)
+
+# Seções do markdown final, na ordem
+FINAL_MARKDOWN_SECTIONS = ("História", "Bug")
+
+# Tamanho (em caracteres) dos pedaços produzidos por iter_final_markdown
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Campos calculados a partir de outra coluna (campo -> coluna lida)
+ENTRY_COLUMN_SOURCES = {'evidence_image_data': 'evidence_image_hash'}
+
+class _EntryMapping:
+    """Acesso por chave dos registros de entry, como os dicts que as consultas retornavam antes"""
+    
+    __slots__ = ()
+    
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self._fields:
+                raise KeyError(key)
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+    
+    def __contains__(self, key):
+        return key in self._fields
+    
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._fields else default
+    
+    def keys(self):
+        return self._fields
+    
+    def values(self):
+        return tuple(self)
+    
+    def items(self):
+        return tuple(zip(self._fields, self))
+
+@functools.lru_cache(maxsize=None)
+def _entry_record_type(fields):
+    """Tipo de registro de uma entry para uma tupla de colunas (criado uma vez por tupla).
+
+    É uma namedtuple (entry.task_title, entry._asdict()) que também aceita
+    acesso por chave: entry['task_title'], entry.get(...), keys(), items(), dict(entry).
+    """
+    return type("EntryRecord", (_EntryMapping, namedtuple("EntryRecord", fields)), {'__slots__': ()})
+
+class ReleaseNotesDB:
+    def __init__(self, db_path="release_notes.db"):
+        self.db_path = db_path
+        # Imagens de evidência ficam em arquivos endereçados pelo SHA-256, ao lado do banco
+        self.blobs = BlobStore(blob_dir_for(db_path))
+        self.init_database()
+    
+    def init_database(self):
+        """Inicializa o banco de dados com as tabelas necessárias (uma vez por processo)"""
+        apply_migrations(self.db_path, MIGRATIONS)
+    
+    def _store_image(self, image):
+        """Grava a imagem no BlobStore e retorna o hash (aceita bytes ou um BlobRef já gravado)"""
+        if image is None:
+            return None
+        if isinstance(image, BlobRef):
+            return image.hash
+        return self.blobs.put(bytes(image))
+    
+    def _select_entries(self, where, params, columns=None, order_by="created_at DESC"):
+        """Consulta entries lendo só as colunas pedidas; retorna registros EntryRecord.
+
+        `columns` é uma sequência de nomes de ENTRY_FIELDS (padrão: todos).
+        Os campos são lidos por atributo (entry.task_title) ou por chave (entry['task_title']).
+        """
+        fields = tuple(columns) if columns else ENTRY_FIELDS
+        unknown = [field for field in fields if field not in ENTRY_FIELDS]
+        if unknown:
+            raise ValueError(f"Colunas desconhecidas: {', '.join(unknown)}")
+        
+        sql_columns = ", ".join(ENTRY_COLUMN_SOURCES.get(field, field) for field in fields)
+        sql = f"SELECT {sql_columns} FROM release_entries"
+        if where:
+            sql += f" WHERE {where}"
+        if order_by:
+            sql += f" ORDER BY {order_by}"
+        
+        EntryRecord = _entry_record_type(fields)
+        blob_positions = [index for index, field in enumerate(fields) if field == 'evidence_image_data']
+        
+        conn = connect(self.db_path)
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        
+        if not blob_positions:
+            return [EntryRecord(*row) for row in rows]
         
-        conn.commit()
-        conn.close()
+        entries = []
+        for row in rows:
+            values = list(row)
+            for index in blob_positions:
+                if values[index]:
+                    values[index] = self.blobs.ref(values[index])
+            entries.append(EntryRecord(*values))
+        return entries
     
     def save_release_entry(self, entry_data):
         """Salva uma entry de release note"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         try:
             cursor.execute('''
                 INSERT INTO release_entries 
                 (jira_task_id, task_title, task_type, task_description, 
-                 generated_content, evidence_image_name, evidence_image_data, 
+                 generated_content, evidence_image_name, evidence_image_hash, 
                  developer_name, sprint_version, status)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
@@ -79,7 +204,7 @@ class ReleaseNotesDB:
                 entry_data['task_description'],
                 entry_data.get('generated_content', ''),
                 entry_data.get('evidence_image_name'),
-                entry_data.get('evidence_image_data'),
+                self._store_image(entry_data.get('evidence_image_data')),
                 entry_data.get('developer_name', ''),
                 entry_data.get('sprint_version', 'current'),
                 entry_data.get('status', 'draft')
@@ -90,21 +215,21 @@ class ReleaseNotesDB:
             return entry_id
             
         except sqlite3.Error as e:
-            st.error(f"Erro ao salvar entry: {e}")
+            report_error(f"Erro ao salvar entry: {e}")
             return None
         finally:
             conn.close()
     
     def update_release_entry(self, entry_id, entry_data):
         """Atualiza uma entry existente"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         try:
             cursor.execute('''
                 UPDATE release_entries 
                 SET task_title=?, task_type=?, task_description=?, 
-                    generated_content=?, evidence_image_name=?, evidence_image_data=?,
+                    generated_content=?, evidence_image_name=?, evidence_image_hash=?,
                     developer_name=?, sprint_version=?, status=?, updated_at=CURRENT_TIMESTAMP
                 WHERE id=?
             ''', (
@@ -113,7 +238,7 @@ class ReleaseNotesDB:
                 entry_data['task_description'],
                 entry_data.get('generated_content', ''),
                 entry_data.get('evidence_image_name'),
-                entry_data.get('evidence_image_data'),
+                self._store_image(entry_data.get('evidence_image_data')),
                 entry_data.get('developer_name', ''),
                 entry_data.get('sprint_version', 'current'),
                 entry_data.get('status', 'draft'),
@@ -124,92 +249,35 @@ class ReleaseNotesDB:
             return cursor.rowcount > 0
             
         except sqlite3.Error as e:
-            st.error(f"Erro ao atualizar entry: {e}")
+            report_error(f"Erro ao atualizar entry: {e}")
             return False
         finally:
             conn.close()
     
-    def get_all_entries(self, sprint_version=None):
-        """Recupera todas as entries, opcionalmente filtradas por sprint"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+    def get_all_entries(self, sprint_version=None, columns=None):
+        """Recupera todas as entries, opcionalmente filtradas por sprint (só as colunas em `columns`, se informado)"""
         try:
             if sprint_version:
-                cursor.execute('''
-                    SELECT * FROM release_entries 
-                    WHERE sprint_version = ? 
-                    ORDER BY created_at DESC
-                ''', (sprint_version,))
-            else:
-                cursor.execute('''
-                    SELECT * FROM release_entries 
-                    ORDER BY created_at DESC
-                ''')
-            
-            entries = []
-            for row in cursor.fetchall():
-                entry = {
-                    'id': row[0],
-                    'jira_task_id': row[1],
-                    'task_title': row[2],
-                    'task_type': row[3],
-                    'task_description': row[4],
-                    'generated_content': row[5],
-                    'evidence_image_name': row[6],
-                    'evidence_image_data': row[7],
-                    'developer_name': row[8],
-                    'created_at': row[9],
-                    'updated_at': row[10],
-                    'sprint_version': row[11],
-                    'status': row[12]
-                }
-                entries.append(entry)
-            
-            return entries
+                return self._select_entries("sprint_version = ?", (sprint_version,), columns)
+            return self._select_entries(None, (), columns)
             
         except sqlite3.Error as e:
-            st.error(f"Erro ao recuperar entries: {e}")
+            report_error(f"Erro ao recuperar entries: {e}")
             return []
-        finally:
-            conn.close()
     
-    def get_entry_by_id(self, entry_id):
+    def get_entry_by_id(self, entry_id, columns=None):
         """Recupera uma entry específica por ID"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute('SELECT * FROM release_entries WHERE id = ?', (entry_id,))
-            row = cursor.fetchone()
-            
-            if row:
-                return {
-                    'id': row[0],
-                    'jira_task_id': row[1],
-                    'task_title': row[2],
-                    'task_type': row[3],
-                    'task_description': row[4],
-                    'generated_content': row[5],
-                    'evidence_image_name': row[6],
-                    'evidence_image_data': row[7],
-                    'developer_name': row[8],
-                    'created_at': row[9],
-                    'updated_at': row[10],
-                    'sprint_version': row[11],
-                    'status': row[12]
-                }
-            return None
+            entries = self._select_entries("id = ?", (entry_id,), columns, order_by=None)
+            return entries[0] if entries else None
             
         except sqlite3.Error as e:
-            st.error(f"Erro ao recuperar entry: {e}")
+            report_error(f"Erro ao recuperar entry: {e}")
             return None
-        finally:
-            conn.close()
     
     def delete_entry(self, entry_id):
         """Deleta uma entry"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         try:
@@ -218,14 +286,25 @@ class ReleaseNotesDB:
             return cursor.rowcount > 0
             
         except sqlite3.Error as e:
-            st.error(f"Erro ao deletar entry: {e}")
+            report_error(f"Erro ao deletar entry: {e}")
             return False
         finally:
             conn.close()
     
+    def remove_unused_images(self):
+        """Apaga do BlobStore as imagens que nenhuma entry referencia mais; retorna quantas"""
+        conn = connect(self.db_path)
+        try:
+            referenced = [row[0] for row in conn.execute(
+                "SELECT DISTINCT evidence_image_hash FROM release_entries WHERE evidence_image_hash IS NOT NULL"
+            )]
+        finally:
+            conn.close()
+        return self.blobs.remove_unreferenced(referenced)
+    
     def create_sprint(self, sprint_name, version, description=""):
         """Cria uma nova sprint/versão"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         try:
@@ -239,17 +318,17 @@ class ReleaseNotesDB:
             return sprint_id
             
         except sqlite3.IntegrityError:
-            st.error(f"Sprint '{sprint_name}' já existe!")
+            report_error(f"Sprint '{sprint_name}' já existe!")
             return None
         except sqlite3.Error as e:
-            st.error(f"Erro ao criar sprint: {e}")
+            report_error(f"Erro ao criar sprint: {e}")
             return None
         finally:
             conn.close()
     
     def get_all_sprints(self):
         """Recupera todas as sprints"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         try:
@@ -268,83 +347,67 @@ class ReleaseNotesDB:
             return sprints
             
         except sqlite3.Error as e:
-            st.error(f"Erro ao recuperar sprints: {e}")
+            report_error(f"Erro ao recuperar sprints: {e}")
             return []
         finally:
             conn.close()
     
-    def get_entries_by_type(self, task_type, sprint_version=None):
+    def get_entries_by_type(self, task_type, sprint_version=None, columns=None):
         """Recupera entries por tipo (História ou Bug)"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         try:
             if sprint_version:
-                cursor.execute('''
-                    SELECT * FROM release_entries 
-                    WHERE task_type = ? AND sprint_version = ?
-                    ORDER BY created_at DESC
-                ''', (task_type, sprint_version))
-            else:
-                cursor.execute('''
-                    SELECT * FROM release_entries 
-                    WHERE task_type = ?
-                    ORDER BY created_at DESC
-                ''', (task_type,))
-            
-            entries = []
-            for row in cursor.fetchall():
-                entry = {
-                    'id': row[0],
-                    'jira_task_id': row[1],
-                    'task_title': row[2],
-                    'task_type': row[3],
-                    'task_description': row[4],
-                    'generated_content': row[5],
-                    'evidence_image_name': row[6],
-                    'evidence_image_data': row[7],
-                    'developer_name': row[8],
-                    'created_at': row[9],
-                    'updated_at': row[10],
-                    'sprint_version': row[11],
-                    'status': row[12]
-                }
-                entries.append(entry)
-            
-            return entries
+                return self._select_entries("task_type = ? AND sprint_version = ?", (task_type, sprint_version), columns)
+            return self._select_entries("task_type = ?", (task_type,), columns)
             
         except sqlite3.Error as e:
-            st.error(f"Erro ao recuperar entries por tipo: {e}")
+            report_error(f"Erro ao recuperar entries por tipo: {e}")
             return []
-        finally:
-            conn.close()
     
     def generate_final_markdown(self, sprint_version=None):
         """Gera o markdown final compilado para download"""
-        historias = self.get_entries_by_type("História", sprint_version)
-        bugs = self.get_entries_by_type("Bug", sprint_version)
-        
-        markdown_content = "[[TOC]]\n\n"
-        
-        # Seção Histórias
-        if historias:
-            markdown_content += "## História\n"
-            for historia in historias:
-                if historia['generated_content']:
-                    markdown_content += historia['generated_content'] + "\n\n"
-        
-        # Seção Bugs
-        if bugs:
-            markdown_content += "## Bug\n"
-            for bug in bugs:
-                if bug['generated_content']:
-                    markdown_content += bug['generated_content'] + "\n\n"
-        
-        return markdown_content
+        return "".join(self.iter_final_markdown(sprint_version))
+    
+    def iter_final_markdown(self, sprint_version=None, chunk_size=EXPORT_CHUNK_SIZE):
+        """Produz o markdown final em pedaços de até ~chunk_size caracteres, lendo as entries do cursor uma a uma"""
+        conn = connect(self.db_path)
+        try:
+            # Uma única transação de leitura: as duas seções veem o mesmo estado do banco
+            conn.execute("BEGIN")
+            parts = ["[[TOC]]\n\n"]
+            size = len(parts[0])
+            
+            for section in FINAL_MARKDOWN_SECTIONS:
+                if sprint_version:
+                    rows = conn.execute(
+                        "SELECT generated_content FROM release_entries WHERE task_type = ? AND sprint_version = ? ORDER BY created_at DESC",
+                        (section, sprint_version)
+                    )
+                else:
+                    rows = conn.execute(
+                        "SELECT generated_content FROM release_entries WHERE task_type = ? ORDER BY created_at DESC",
+                        (section,)
+                    )
+                
+                for index, (generated_content,) in enumerate(rows):
+                    if index == 0:
+                        parts.append(f"## {section}\n")
+                    if generated_content:
+                        parts.append(generated_content + "\n\n")
+                        size += len(parts[-1])
+                    
+                    if size >= chunk_size:
+                        yield "".join(parts)
+                        parts = []
+                        size = 0
+            
+            if parts:
+                yield "".join(parts)
+        finally:
+            conn.close()
     
     def save_rag_document(self, filename, content, file_size):
         """Salva documento para RAG"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         try:
@@ -358,14 +421,14 @@ class ReleaseNotesDB:
             return doc_id
             
         except sqlite3.Error as e:
-            st.error(f"Erro ao salvar documento RAG: {e}")
+            report_error(f"Erro ao salvar documento RAG: {e}")
             return None
         finally:
             conn.close()
     
     def get_rag_documents(self):
         """Recupera todos os documentos RAG"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         try:
@@ -384,7 +447,7 @@ class ReleaseNotesDB:
             return documents
             
         except sqlite3.Error as e:
-            st.error(f"Erro ao recuperar documentos RAG: {e}")
+            report_error(f"Erro ao recuperar documentos RAG: {e}")
             return []
         finally:
             conn.close()
\ No newline at end of file
@@ -0,0 +1,136 @@
+import re
+
+# Seções do documento, na ordem em que aparecem no markdown
+SECTION_ORDER = ('User Story', 'Bug', 'Improvement', 'Technical Debt')
+
+# Tipo especial usado quando o usuário edita o markdown inteiro da versão
+MANUAL_EDIT_TYPE = 'MANUAL_EDIT'
+
+# Nomes antigos de tipos de task, ainda presentes em bancos existentes
+TASK_TYPE_ALIASES = {'User Story': ('História',)}
+
+# Posição de tipos fora das seções conhecidas (e de MANUAL_EDIT) na ordenação das tasks
+OTHER_SECTION_RANK = len(SECTION_ORDER) + 1
+
+# Nome em minúsculas (tipo ou alias) -> tipo de SECTION_ORDER
+_TASK_TYPE_LOOKUP = {
+    name.lower(): task_type
+    for task_type in SECTION_ORDER
+    for name in (task_type,) + TASK_TYPE_ALIASES.get(task_type, ())
+}
+
+MARKDOWN_HEADER = "[[_TOC_]]\n\n---\n\n"
+EMPTY_MARKDOWN = "[[_TOC_]]\n\n---\n\n*Nenhuma task adicionada ainda*"
+
+
+class ReleaseNotesDocument:
+    """Documento de release notes organizado por seção.
+
+    Cada seção guarda os fragmentos já renderizados de suas tasks, na ordem de
+    inserção. Adicionar ou substituir uma task altera apenas o seu fragmento, e
+    o texto final é produzido com um único join.
+    """
+
+    def __init__(self):
+        # dict preserva a ordem de inserção: jira_task_id -> fragmento renderizado
+        self.sections = {task_type: {} for task_type in SECTION_ORDER}
+        # Tasks de tipos fora das seções conhecidas não aparecem no texto
+        self.other_tasks = {}
+        # Conteúdo editado manualmente (guardado sem formatação extra)
+        self.manual_edits = {}
+        self._task_sections = {}
+        self.text = None
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Cria o documento a partir de linhas (task_type, jira_task_id, generated_content)"""
+        document = cls()
+        for task_type, jira_task_id, generated_content in rows:
+            document.set_task(task_type, jira_task_id, generated_content)
+        return document
+
+    def set_task(self, task_type, jira_task_id, generated_content):
+        """Adiciona uma task ou substitui a existente com o mesmo ID (vai para o fim da seção)"""
+        self.remove_task(jira_task_id)
+
+        if task_type == MANUAL_EDIT_TYPE:
+            section = self.manual_edits
+            fragment = generated_content
+        else:
+            section = self.sections.get(task_type, self.other_tasks)
+            fragment = f"{generated_content}\n\n"
+
+        section[jira_task_id] = fragment
+        self._task_sections[jira_task_id] = section
+        self.text = None
+
+    def remove_task(self, jira_task_id):
+        """Remove uma task do documento, se existir"""
+        section = self._task_sections.pop(jira_task_id, None)
+        if section is not None:
+            del section[jira_task_id]
+            self.text = None
+
+    def __len__(self):
+        return len(self._task_sections)
+
+    def render(self):
+        """Retorna o markdown do documento (reaproveita o último texto se nada mudou)"""
+        if self.text is not None:
+            return self.text
+
+        if not self._task_sections:
+            self.text = EMPTY_MARKDOWN
+        elif self.manual_edits:
+            # Conteúdo editado manualmente substitui o documento inteiro
+            self.text = next(iter(self.manual_edits.values()))
+        else:
+            parts = [MARKDOWN_HEADER]
+            for task_type, fragments in self.sections.items():
+                if fragments:
+                    parts.append(f"##{task_type}\n")
+                    parts.extend(fragments.values())
+            self.text = "".join(parts).rstrip() + "\n"
+
+        return self.text
+
+
+def normalize_entry(generated_content):
+    """Bloco de uma task com quebras de linha reais (entradas antigas foram gravadas com '\\n' literal)"""
+    return generated_content.replace("\\n", "\n").strip()
+
+
+def entry_description(generated_content):
+    """Só a descrição de um bloco montado por format_task_entry (sem título, QA Level, imagens e separador)"""
+    lines = [
+        line for line in normalize_entry(generated_content).splitlines()
+        if not line.lstrip().startswith(("###", "**QA Level", "![")) and line.strip() != "---"
+    ]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def canonical_task_type(task_type):
+    """Tipo de SECTION_ORDER correspondente a task_type (aceita os aliases, sem diferenciar maiúsculas), ou None"""
+    return _TASK_TYPE_LOOKUP.get(str(task_type or "").strip().lower())
+
+
+def section_rank(task_type):
+    """Posição do tipo de task na ordem das seções (coluna tasks.type_rank)"""
+    if task_type in SECTION_ORDER:
+        return SECTION_ORDER.index(task_type) + 1
+    return OTHER_SECTION_RANK
+
+
+def format_task_entry(task_data, description):
+    """Monta o bloco markdown de uma task: título (com link do TFS, se houver), QA Level e descrição"""
+    if task_data.get('tfs_link'):
+        title_formatted = f"###[[{task_data['jira_task_id']}] {task_data['jira_task_title']}]({task_data['tfs_link']})"
+    else:
+        title_formatted = f"###[{task_data['jira_task_id']}] {task_data['jira_task_title']}"
+
+    if task_data.get('qa_level') is not None:
+        qa_line = f"\n\n**QA Level: {task_data['qa_level']}**\n\n"
+    else:
+        qa_line = "\n\n"
+
+    return f"{title_formatted}{qa_line}{description.strip()}\n\n---"
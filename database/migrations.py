@@ -0,0 +1,54 @@
+import os
+import threading
+from database.connection import connect
+
+# Bancos já migrados neste processo: (caminho absoluto, versão alvo)
+_migrated = set()
+_lock = threading.Lock()
+
+
+def apply_migrations(db_path, migrations):
+    """Aplica as migrações pendentes de um banco, uma única vez por processo.
+
+    `migrations` é uma lista ordenada; a migração de índice i leva o banco
+    para `PRAGMA user_version = i + 1`. Cada item é uma tupla de comandos SQL
+    ou uma função que recebe a conexão (para migrações de dados).
+    """
+    target_version = len(migrations)
+    key = (os.path.abspath(db_path), target_version)
+    if key in _migrated:
+        return
+
+    with _lock:
+        if key in _migrated:
+            return
+
+        conn = connect(db_path)
+        try:
+            current_version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if current_version < target_version:
+                # BEGIN IMMEDIATE serializa migrações concorrentes entre processos
+                conn.execute("BEGIN IMMEDIATE")
+                current_version = conn.execute("PRAGMA user_version").fetchone()[0]
+                for version in range(current_version, target_version):
+                    migration = migrations[version]
+                    if callable(migration):
+                        migration(conn)
+                    else:
+                        for statement in migration:
+                            conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {target_version}")
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        _migrated.add(key)
+
+
+def reset_migration_cache():
+    """Esquece quais bancos já foram migrados (útil após apagar o arquivo do banco)"""
+    with _lock:
+        _migrated.clear()
@@ -0,0 +1,79 @@
+import re
+import unicodedata
+import zlib
+
+import numpy as np
+
+# Tamanho da assinatura MinHash e divisão em faixas para o LSH (LSH_BANDS x LSH_ROWS = NUM_PERM).
+# Um par com similaridade de Jaccard s vira candidato com probabilidade 1 - (1 - s^LSH_ROWS)^LSH_BANDS.
+# Com 32 faixas de 2 linhas: ~0,9999 em s = 0,5 (o limiar NEAR_DUPLICATE_THRESHOLD), 0,95 em s = 0,3
+# e 0,28 em s = 0,1; os candidatos abaixo do limiar são descartados pela comparação das assinaturas
+NUM_PERM = 64
+LSH_BANDS = 32
+LSH_ROWS = NUM_PERM // LSH_BANDS
+
+# Palavras por shingle
+SHINGLE_SIZE = 2
+
+# Primo logo acima de 2^32: (a * x + b) mod p com x, a e b de 32 bits cabe em uint64
+_PRIME = np.uint64(4294967311)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+# Permutações fixas (a semente não pode mudar: as assinaturas ficam gravadas no banco)
+_rng = np.random.RandomState(20240601)
+_PERM_A = _rng.randint(1, 2 ** 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 2 ** 32, size=NUM_PERM, dtype=np.uint64)
+# Mistura dos valores de cada faixa em uma chave de 64 bits (multiplicadores ímpares e um sal por faixa)
+_BAND_MIX = _rng.randint(0, 2 ** 63, size=LSH_ROWS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_BAND_SALT = _rng.randint(0, 2 ** 63, size=LSH_BANDS, dtype=np.uint64)
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def words(text):
+    """Palavras do texto, em minúsculas e sem acentos"""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    return _WORD_PATTERN.findall(text)
+
+
+def shingle_hashes(text):
+    """Hashes de 32 bits (distintos) das sequências de SHINGLE_SIZE palavras do texto"""
+    text_words = words(text)
+    if not text_words:
+        return np.zeros(0, dtype=np.uint64)
+    # Hash de cada palavra uma vez; o hash de um shingle combina os hashes das suas palavras
+    word_hashes = np.fromiter((zlib.crc32(word.encode("ascii")) for word in text_words), dtype=np.uint64, count=len(text_words))
+    count = max(1, len(text_words) - SHINGLE_SIZE + 1)
+    hashes = word_hashes[:count].copy()
+    for offset in range(1, min(SHINGLE_SIZE, len(text_words))):
+        hashes = (hashes * np.uint64(0x01000193) + word_hashes[offset:offset + count]) & _MAX_HASH
+    return np.unique(hashes)
+
+
+def minhash_signature(text):
+    """Assinatura MinHash (NUM_PERM valores uint32) do texto, ou None se ele não tem palavras"""
+    hashes = shingle_hashes(text)
+    if not len(hashes):
+        return None
+    permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _PRIME
+    return (permuted.min(axis=1) & _MAX_HASH).astype(np.uint32)
+
+
+def band_keys(signature):
+    """Chave de balde de cada faixa da assinatura (inteiro de 64 bits com sinal, como o SQLite guarda).
+
+    Colisões entre faixas diferentes só trazem candidatos a mais, que são
+    descartados pela comparação das assinaturas.
+    """
+    bands = signature.reshape(LSH_BANDS, LSH_ROWS).astype(np.uint64)
+    keys = (bands * _BAND_MIX).sum(axis=1, dtype=np.uint64) ^ _BAND_SALT
+    return keys.view(np.int64).tolist()
+
+
+def signature_from_blob(blob):
+    return np.frombuffer(blob, dtype=np.uint32)
+
+
+def estimated_similarity(signature, other):
+    """Similaridade de Jaccard estimada: fração de posições iguais nas duas assinaturas"""
+    return float(np.count_nonzero(signature == other)) / NUM_PERM
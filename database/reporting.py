@@ -0,0 +1,18 @@
+import logging
+import sys
+
+logger = logging.getLogger("release_notes.database")
+
+
+def report_error(message):
+    """Mostra um erro do banco para o usuário.
+
+    No app, o Streamlit já está carregado e o erro aparece com st.error; fora
+    dele (linha de comando, scripts) vai para o log. O Streamlit nunca é
+    importado aqui: carregá-lo só para isso atrasaria a inicialização da CLI.
+    """
+    streamlit = sys.modules.get("streamlit")
+    if streamlit is not None:
+        streamlit.error(message)
+    else:
+        logger.error(message)
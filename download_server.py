@@ -0,0 +1,75 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote
+from database.collaborative_db import get_collaborative_db
+
+# Rota servida ao lado do app Streamlit: /release-notes/<versão>.md
+DOWNLOAD_ROUTE = "/release-notes/"
+
+# Tamanho (em caracteres) dos blocos enviados na resposta
+CHUNK_SIZE = 64 * 1024
+
+_server = None
+_server_lock = threading.Lock()
+
+
+class ReleaseNotesDownloadHandler(BaseHTTPRequestHandler):
+    """Entrega o markdown de uma versão somente quando o link é clicado"""
+
+    db_path = "collaborative_release_notes.db"
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if not path.startswith(DOWNLOAD_ROUTE) or not path.endswith(".md"):
+            self.send_error(404, "Rota não encontrada")
+            return
+
+        version_name = unquote(path[len(DOWNLOAD_ROUTE):-len(".md")])
+        db = get_collaborative_db(self.db_path)
+        version_id, _ = db.get_version_if_exists(version_name)
+        if not version_id:
+            self.send_error(404, "Versão não encontrada")
+            return
+
+        # Sem Content-Length (HTTP/1.0): o fim da resposta é o fechamento da conexão,
+        # então o markdown é enviado à medida que é lido do banco
+        self.send_response(200)
+        self.send_header("Content-Type", "text/markdown; charset=utf-8")
+        self.send_header(
+            "Content-Disposition",
+            f"attachment; filename*=UTF-8''{quote(f'release_notes_{version_name}.md')}"
+        )
+        self.end_headers()
+        for chunk in db.iter_collaborative_markdown(version_name, chunk_size=CHUNK_SIZE):
+            self.wfile.write(chunk.encode("utf-8"))
+
+    def log_message(self, format, *args):
+        # Silencia o log padrão de cada requisição no terminal do Streamlit
+        pass
+
+
+def start_download_server(port, host="127.0.0.1", db_path="collaborative_release_notes.db"):
+    """Sobe (uma vez por processo) o servidor HTTP de downloads em uma thread daemon"""
+    global _server
+    with _server_lock:
+        if _server is None:
+            handler = type("Handler", (ReleaseNotesDownloadHandler,), {"db_path": db_path})
+            _server = ThreadingHTTPServer((host, int(port)), handler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+        return _server
+
+
+def stop_download_server():
+    """Para o servidor de downloads, se estiver rodando"""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            _server.shutdown()
+            _server.server_close()
+            _server = None
+
+
+def download_url(base_url, version_name):
+    """Monta o link de download de uma versão"""
+    return f"{base_url.rstrip('/')}{DOWNLOAD_ROUTE}{quote(version_name)}.md"
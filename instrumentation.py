@@ -0,0 +1,159 @@
+"""Medição por rerun do Streamlit: tempo, número de chamadas e linhas por operação.
+
+Métodos decorados com @profiled (banco colaborativo e chamadas ao LLM) só são
+medidos enquanto há um perfil ativo na thread (start_rerun ... finish_rerun);
+fora disso o decorator apenas chama a função. Os tempos são inclusivos: uma
+operação que chama outra soma o tempo das duas.
+
+Com PROFILE_JSONL=<arquivo> cada rerun é gravado como uma linha JSON.
+"""
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from database.connection import get_pool
+
+_local = threading.local()
+_dump_lock = threading.Lock()
+
+
+def count_rows(result):
+    """Quantidade de linhas de um resultado (listas e tuplas); None para os demais"""
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return None
+
+
+class RerunProfile:
+    """Acumula as medições de um rerun, agrupadas pelo nome da operação"""
+
+    def __init__(self, label=None):
+        self.label = label
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.wall_ms = None
+        self.operations = {}
+        self.pool = None
+
+    def add(self, name, elapsed_ms, rows=None):
+        operation = self.operations.get(name)
+        if operation is None:
+            operation = self.operations[name] = {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'errors': 0}
+        operation['calls'] += 1
+        operation['total_ms'] += elapsed_ms
+        operation['max_ms'] = max(operation['max_ms'], elapsed_ms)
+        if rows:
+            operation['rows'] += rows
+
+    def add_error(self, name):
+        self.operations.setdefault(name, {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'errors': 0})
+        self.operations[name]['errors'] += 1
+
+    def elapsed_ms(self):
+        """Tempo de parede do rerun (até agora, se ainda não terminou)"""
+        if self.wall_ms is not None:
+            return self.wall_ms
+        return (time.perf_counter() - self._start) * 1000
+
+    def summary(self):
+        """Operações ordenadas pelo tempo total, prontas para exibir ou serializar"""
+        operations = [
+            dict(name=name, **{key: round(value, 3) if isinstance(value, float) else value for key, value in data.items()})
+            for name, data in self.operations.items()
+        ]
+        operations.sort(key=lambda operation: operation['total_ms'], reverse=True)
+        return {
+            'label': self.label,
+            'started_at': self.started_at,
+            'wall_ms': round(self.elapsed_ms(), 3),
+            'operations': operations,
+            'pool': self.pool if self.pool is not None else get_pool().get_stats(),
+        }
+
+
+def current_profile():
+    """Perfil ativo na thread atual, ou None"""
+    return getattr(_local, 'profile', None)
+
+
+def start_rerun(label=None):
+    """Inicia a medição de um rerun na thread atual (zera também os contadores do pool de conexões)"""
+    get_pool().reset_stats()
+    _local.profile = RerunProfile(label)
+    return _local.profile
+
+
+def finish_rerun():
+    """Encerra a medição do rerun atual e grava em PROFILE_JSONL, se definido"""
+    profile = current_profile()
+    if profile is None:
+        return None
+    _local.profile = None
+
+    profile.wall_ms = (time.perf_counter() - profile._start) * 1000
+    profile.pool = get_pool().get_stats()
+
+    dump_path = os.getenv("PROFILE_JSONL")
+    if dump_path:
+        line = json.dumps(profile.summary(), ensure_ascii=False)
+        with _dump_lock:
+            with open(dump_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    return profile
+
+
+@contextmanager
+def measure(name):
+    """Mede um bloco de código; o dicionário produzido aceita 'rows' com a quantidade de linhas"""
+    profile = current_profile()
+    record = {'rows': None}
+    if profile is None:
+        yield record
+        return
+
+    start = time.perf_counter()
+    try:
+        yield record
+    except Exception:
+        profile.add_error(name)
+        raise
+    finally:
+        profile.add(name, (time.perf_counter() - start) * 1000, record['rows'])
+
+
+def profiled(name=None, rows=count_rows):
+    """Decorator que mede cada chamada no perfil ativo (funções comuns e geradoras).
+
+    `rows` recebe o resultado e devolve a quantidade de linhas (None para não contar).
+    Em geradores, conta os itens produzidos e mede até o fim do consumo.
+    """
+    def decorator(func):
+        operation = name or func.__qualname__
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                if current_profile() is None:
+                    yield from func(*args, **kwargs)
+                    return
+                with measure(operation) as record:
+                    record['rows'] = 0
+                    for item in func(*args, **kwargs):
+                        record['rows'] += 1
+                        yield item
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if current_profile() is None:
+                return func(*args, **kwargs)
+            with measure(operation) as record:
+                result = func(*args, **kwargs)
+                record['rows'] = rows(result) if rows else None
+                return result
+        return wrapper
+
+    return decorator